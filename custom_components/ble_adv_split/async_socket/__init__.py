@@ -1,14 +1,18 @@
 """Async Socket Package."""
 
 import asyncio
+import builtins
+import errno
+import io
 import logging
 import os
 import pickle
 import socket
+import struct
 from abc import ABC, abstractmethod
 from collections.abc import Awaitable, Callable, Coroutine
 from functools import partialmethod
-from typing import Any
+from typing import Any, ClassVar
 
 from btsocket import btmgmt_socket
 
@@ -18,9 +22,39 @@ type SocketWaitRecvCallback = Callable[[], Awaitable[tuple[bytes | None, bool]]]
 
 TUNNEL_SOCKET_FILE_VAR = "TUNNEL_SOCKET_FILE"
 
+RECV_BUFFER_SIZE = 4096
+
+# Tunnel framing: 2 bytes big endian length + pickled payload, the format is imposed by the tunnel server
+TUNNEL_VERSION = 10
+TUNNEL_ACTION_RESULT = 0
+TUNNEL_ACTION_EXCEPTION = 1
+TUNNEL_ACTION_RECV = 10
+TUNNEL_HEADER = struct.Struct(">H")
+TUNNEL_SOCKET_BUFFER_SIZE = 65536
+
 _LOGGER = logging.getLogger(__name__)
 
 
+class _TunnelUnpickler(pickle.Unpickler):
+    """Unpickler restricted to the data and exceptions sent back by the tunnel server.
+
+    Any other global (functions, arbitrary classes) is refused, so a frame cannot execute code.
+    """
+
+    _ALLOWED_GLOBALS: ClassVar[dict[tuple[str, str], type]] = {
+        ("btsocket.btmgmt_socket", "BluetoothSocketError"): btmgmt_socket.BluetoothSocketError,
+    }
+
+    def find_class(self, module: str, name: str) -> type:
+        """Only allow exceptions."""
+        if module == "builtins" and isinstance(cls := getattr(builtins, name, None), type) and issubclass(cls, BaseException):
+            return cls
+        if (cls := self._ALLOWED_GLOBALS.get((module, name))) is not None:
+            return cls
+        msg = f"Forbidden global in tunnel frame: '{module}.{name}'"
+        raise pickle.UnpicklingError(msg)
+
+
 class AsyncSocketBase(ABC):
     """Base Async Socket."""
 
@@ -35,6 +69,7 @@ class AsyncSocketBase(ABC):
         self._cmd_res: bytes | None = None
         self._cmd_lock = asyncio.Lock()
         self._is_mgmt: bool = False
+        self._loop: asyncio.AbstractEventLoop | None = None
 
     @abstractmethod
     async def _async_open_socket(self, name: str, *args) -> int:  # noqa: ANN002
@@ -53,6 +88,7 @@ class AsyncSocketBase(ABC):
         *args,  # noqa: ANN002
     ) -> int:
         """Async Initialize an async socket: setup the callbacks and create the socket."""
+        self._loop = asyncio.get_running_loop()
         self._is_mgmt = is_mgmt
         self._on_recv = read_callback
         self._on_error = error_callback
@@ -67,7 +103,8 @@ class AsyncSocketBase(ABC):
         """Help function: starts a listening loop."""
         self._ready_recv_event.clear()
         self._recv_task = asyncio.create_task(self._async_base_receive(wait_recv_callback))
-        await asyncio.wait_for(self._ready_recv_event.wait(), 1)
+        async with asyncio.timeout(1):
+            await self._ready_recv_event.wait()
 
     async def _async_base_receive(self, wait_recv_callback: SocketWaitRecvCallback) -> None:
         self._ready_recv_event.set()
@@ -108,7 +145,9 @@ class AsyncSocketBase(ABC):
             self._cmd_exc = None
             self._cmd_res = None
             await self._async_call(method, *args)
-            await asyncio.wait_for(self._cmd_event.wait(), 1)
+            if not self._cmd_event.is_set():  # result not already available: wait for it
+                async with asyncio.timeout(1):
+                    await self._cmd_event.wait()
             if self._cmd_exc is not None:
                 raise self._cmd_exc
             return self._cmd_res
@@ -135,6 +174,8 @@ class AsyncSocket(AsyncSocketBase):
     def __init__(self) -> None:
         super().__init__()
         self._socket: socket.socket | None = None
+        self._recv_buf = bytearray(RECV_BUFFER_SIZE)
+        self._recv_view = memoryview(self._recv_buf)
 
     async def _async_open_socket(self, _: str, *args) -> int:  # noqa: ANN002
         if self._is_mgmt:
@@ -149,20 +190,25 @@ class AsyncSocket(AsyncSocketBase):
 
     async def _async_recv(self) -> tuple[bytes | None, bool]:
         """Receive Data from socket."""
-        if self._socket is None:
+        if self._socket is None or self._loop is None:
             return None, False
-        data = await asyncio.get_event_loop().sock_recv(self._socket, 4096)
-        return data, len(data) > 0
+        nbytes = await self._loop.sock_recv_into(self._socket, self._recv_view)
+        return bytes(self._recv_view[:nbytes]), nbytes > 0
 
-    def _call_done(self, future: asyncio.Future) -> None:
-        if (exc := future.exception()) is not None:
+    async def _async_call(self, method: str, *args) -> None:  # noqa: ANN002
+        if self._socket is None or self._loop is None:
+            self._base_call_exception(OSError(errno.EBADF, "Socket not opened"))
+            return
+        try:
+            # the socket is non blocking: only sendall may need to wait for the socket to be writable
+            if method == "sendall":
+                result = await self._loop.sock_sendall(self._socket, *args)
+            else:
+                result = getattr(self._socket, method)(*args)
+        except Exception as exc:
             self._base_call_exception(exc)
         else:
-            self._base_call_result(future.result())
-
-    async def _async_call(self, method: str, *args) -> None:  # noqa: ANN002
-        future = asyncio.get_event_loop().run_in_executor(None, getattr(self._socket, method), *args)
-        future.add_done_callback(self._call_done)
+            self._base_call_result(result)
 
     def _close(self) -> None:
         """Close."""
@@ -181,49 +227,65 @@ class AsyncTunnelSocket(AsyncSocketBase):
 
     def __init__(self) -> None:
         super().__init__()
-        self._unix_reader = None
-        self._unix_writer = None
+        self._unix_sock: socket.socket | None = None
+        self._len_view = memoryview(bytearray(TUNNEL_HEADER.size))
+        self._data_buf = bytearray(RECV_BUFFER_SIZE)
 
     async def _async_open_socket(self, name: str, *args) -> int:  # noqa: ANN002
-        self._unix_reader, self._unix_writer = await asyncio.open_unix_connection(path=self.SOCKET_TUNNEL_FILE)
+        self._unix_sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._unix_sock.setblocking(False)
+        self._unix_sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, TUNNEL_SOCKET_BUFFER_SIZE)
+        self._unix_sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, TUNNEL_SOCKET_BUFFER_SIZE)
+        await self._loop.sock_connect(self._unix_sock, self.SOCKET_TUNNEL_FILE)
         await self._setup_recv_loop(self._async_recv)
         return await self._async_call_base("##MGMTCREATE" if self._is_mgmt else "##CREATE", name, *args)
 
     async def _async_start_recv(self) -> None:
-        await self._async_call_base("##RECV", 4096)
+        await self._async_call_base("##RECV", RECV_BUFFER_SIZE)
+
+    async def _async_recv_exactly(self, view: memoryview) -> bool:
+        """Fill the full view from the unix socket, return False if the peer closed the connection."""
+        nbytes = 0
+        while nbytes < len(view):
+            if self._unix_sock is None or self._loop is None or not (nread := await self._loop.sock_recv_into(self._unix_sock, view[nbytes:])):
+                return False
+            nbytes += nread
+        return True
 
     async def _async_recv(self) -> tuple[bytes | None, bool]:
         """Receive Data from socket."""
-        if self._unix_reader is None:
+        if self._unix_sock is None or not await self._async_recv_exactly(self._len_view):
             return None, False
-        data_len = int.from_bytes(await self._unix_reader.read(2))
+        (data_len,) = TUNNEL_HEADER.unpack_from(self._len_view)
         if not data_len:
             return None, False
-        data = await self._unix_reader.read(data_len)
-        action, recv_data = pickle.loads(data)  # noqa: S301
-        if action == 0:
+        if data_len > len(self._data_buf):
+            self._data_buf = bytearray(data_len)
+        data = memoryview(self._data_buf)[:data_len]
+        if not await self._async_recv_exactly(data):
+            return None, False
+        action, recv_data = _TunnelUnpickler(io.BytesIO(data)).load()
+        if action == TUNNEL_ACTION_RESULT:
             self._base_call_result(recv_data)
             return None, True
-        if action == 1:
+        if action == TUNNEL_ACTION_EXCEPTION:
             self._base_call_exception(recv_data)
             return None, True
-        if action == 10 and self._on_recv:
+        if action == TUNNEL_ACTION_RECV and self._on_recv:
             return recv_data, True
         return None, True
 
     async def _async_call(self, method: str, *args) -> None:  # noqa: ANN002
-        if self._unix_writer is None:
+        if self._unix_sock is None or self._loop is None:
             return
-        data = pickle.dumps((10, [method, *args]))
-        self._unix_writer.write(len(data).to_bytes(2))
-        self._unix_writer.write(data)
-        await self._unix_writer.drain()
+        data = pickle.dumps((TUNNEL_VERSION, [method, *args]))
+        await self._loop.sock_sendall(self._unix_sock, TUNNEL_HEADER.pack(len(data)) + data)
 
     def _close(self) -> None:
         """Closure."""
-        if self._unix_writer:
-            self._unix_writer.close()
-            self._unix_writer = None
+        if self._unix_sock:
+            self._unix_sock.close()
+            self._unix_sock = None
 
 
 def create_async_socket() -> AsyncSocketBase:
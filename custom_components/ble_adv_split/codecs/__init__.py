@@ -1,5 +1,8 @@
 """Codecs Package."""
 
+from collections.abc import Mapping
+from types import MappingProxyType
+
 from .agarce import CODECS as AGARCE_CODECS
 from .fanlamp import FLCODECS, LSCODECS
 from .le import CODECS as LE_CODECS
@@ -25,22 +28,27 @@ PHONE_APPS = {
 }
 
 
-def get_codec_list() -> list[BleAdvCodec]:
-    """Get codec list."""
-    return [
-        *FLCODECS,
-        *LSCODECS,
-        *ZHIJIA_CODECS,
-        *ZHIMEI_CODECS,
-        *AGARCE_CODECS,
-        *REMOTES_CODECS,
-        *MANTRA_CODECS,
-        *LE_CODECS,
-        *RUIXIN_CODECS,
-        *RW_CODECS,
-    ]
-
-
-def get_codecs() -> dict[str, BleAdvCodec]:
-    """Get codec map."""
-    return {x.codec_id: x for x in get_codec_list()}
+_CODEC_LIST: tuple[BleAdvCodec, ...] = (
+    *FLCODECS,
+    *LSCODECS,
+    *ZHIJIA_CODECS,
+    *ZHIMEI_CODECS,
+    *AGARCE_CODECS,
+    *REMOTES_CODECS,
+    *MANTRA_CODECS,
+    *LE_CODECS,
+    *RUIXIN_CODECS,
+    *RW_CODECS,
+)
+
+_CODECS_MAP: Mapping[str, BleAdvCodec] = MappingProxyType({x.codec_id: x for x in _CODEC_LIST})
+
+
+def get_codec_list() -> tuple[BleAdvCodec, ...]:
+    """Get codec list, built once at import."""
+    return _CODEC_LIST
+
+
+def get_codecs() -> Mapping[str, BleAdvCodec]:
+    """Get codec map, built once at import, read-only."""
+    return _CODECS_MAP
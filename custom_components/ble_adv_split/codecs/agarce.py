@@ -1,5 +1,7 @@
 """Smart Light (Agarce) codecs."""
 
+import struct
+from functools import lru_cache
 from typing import Any, ClassVar
 
 from .const import (
@@ -28,6 +30,18 @@ from .models import (
 )
 from .models import EncoderMatcher as EncCmd
 
+# seed, tx_count, app_restart_count, rem_seq (2 bytes), id, cmd, arg0, arg1, arg2, index
+_FRAME = struct.Struct("<HBBBBIBBBBB")
+
+
+@lru_cache(maxsize=256)
+def _crypt_mask(seed: int, buf_len: int) -> int:
+    """Compute the Agarce XOR mask of a seed, as a big integer of buf_len bytes."""
+    # pivot pattern is (lo, hi, hi, lo): combined with the MATRIX it gives an 8 bytes key stream
+    pivots = [seed & 0xFF, seed >> 8, seed >> 8, seed & 0xFF] * 2
+    key = bytes([x ^ y for x, y in zip(AgarceEncoder.MATRIX, pivots, strict=True)])
+    return int.from_bytes((key * ((buf_len >> 3) + 1))[:buf_len])
+
 
 class AgarceEncoder(BleAdvCodec):
     """Agarce encoder."""
@@ -38,19 +52,22 @@ class AgarceEncoder(BleAdvCodec):
     _len = 18
     _seed_max = 0xFFF5
 
-    MATRIX: ClassVar[list[int]] = [0xAA, 0xBB, 0xCC, 0xDD, 0x5A, 0xA5, 0xA5, 0x5A]
+    MATRIX: ClassVar[bytes] = bytes([0xAA, 0xBB, 0xCC, 0xDD, 0x5A, 0xA5, 0xA5, 0x5A])
 
     def _crypt(self, buffer: bytes, seed: int) -> bytearray:
-        pivot0 = seed & 0xFF
-        pivot1 = seed >> 8
-        return bytearray([x ^ self.MATRIX[i % 8] ^ (pivot0 if (((i + 1) / 2 % 2) < 1) else pivot1) for i, x in enumerate(buffer)])
+        # XOR the whole buffer at once with the key stream as big integers
+        buf_len = len(buffer)
+        return bytearray((int.from_bytes(buffer) ^ _crypt_mask(seed, buf_len)).to_bytes(buf_len))
+
+    def _checksum(self, buffer: bytes | memoryview) -> int:
+        return sum(buffer) & 0xFF
 
     def decrypt(self, buffer: bytes) -> bytes | None:
         """Decrypt / unwhiten an incoming raw buffer into a readable buffer."""
-        if not self.is_eq(sum(buffer[:-1]) & 0xFF, buffer[-1], "Checksum2"):
+        if not self.is_eq(self._checksum(memoryview(buffer)[:-1]), buffer[-1], "Checksum2"):
             return None
         decoded = self._crypt(buffer[3:-1], int.from_bytes(buffer[1:3], "little"))
-        if not self.is_eq(sum(decoded[:-1]) & 0xFF, decoded[-1], "Checksum"):
+        if not self.is_eq(self._checksum(memoryview(decoded)[:-1]), decoded[-1], "Checksum"):
             return None
         is_pair = (decoded[8] & 0xF0) == 0x00
         # Exclude Group Commands, ref https://github.com/NicoIIT/esphome-components/issues/17#issuecomment-2597871821
@@ -64,7 +81,7 @@ class AgarceEncoder(BleAdvCodec):
             decoded[10] = 0
         else:
             decoded[12] = ((decoded[12] & 0x0F) << 4) + (decoded[8] & 0x0F)
-        return bytes([prefix, buffer[1], buffer[2], *decoded[:-1]])
+        return bytes([prefix]) + buffer[1:3] + decoded[:-1]
 
     def encrypt(self, buffer: bytes) -> bytes:
         """Encrypt / whiten a readable buffer."""
@@ -79,46 +96,56 @@ class AgarceEncoder(BleAdvCodec):
         else:
             decoded[8] |= decoded[12] & 0x0F
             decoded[12] = (decoded[12] >> 4) & 0x0F
-        decoded.append(sum(decoded) & 0xFF)
-        decoded = bytearray([prefix, buffer[1], buffer[2]]) + self._crypt(decoded, int.from_bytes(buffer[1:3], "little"))
-        return bytes([*decoded, sum(decoded) & 0xFF])
+        decoded.append(self._checksum(decoded))
+        encoded = bytearray([prefix]) + buffer[1:3] + self._crypt(decoded, int.from_bytes(buffer[1:3], "little"))
+        encoded.append(self._checksum(encoded))
+        return bytes(encoded)
 
     def convert_to_enc(self, decoded: bytes) -> tuple[BleAdvEncCmd | None, BleAdvConfig | None]:
         """Convert a readable buffer into an encoder command and a config."""
-        enc_cmd = BleAdvEncCmd(decoded[10] & 0xF0)
-        enc_cmd.arg0 = decoded[11]
-        enc_cmd.arg1 = decoded[12]
-        enc_cmd.arg2 = decoded[13]
+        # rem_seq (2 bytes) is ignored;  // 0x1000 / 0x5000 ?
+        (seed, tx_count, app_restart_count, _, _, config_id, cmd, arg0, arg1, arg2, index) = _FRAME.unpack_from(decoded)
+        enc_cmd = BleAdvEncCmd(cmd & 0xF0)
+        enc_cmd.arg0 = arg0
+        enc_cmd.arg1 = arg1
+        enc_cmd.arg2 = arg2
 
         conf = BleAdvConfig()
-        conf.tx_count = decoded[2]
-        conf.app_restart_count = decoded[3]
-        # decoded[4:5] => rem_seq;  // 0x1000 / 0x5000 ?
-        conf.id = int.from_bytes(decoded[6:10], "little")
-        conf.index = decoded[14]
-        conf.seed = int.from_bytes(decoded[0:2], "little")
+        conf.tx_count = tx_count
+        conf.app_restart_count = app_restart_count
+        conf.id = config_id
+        conf.index = index
+        conf.seed = seed
         return enc_cmd, conf
 
     def convert_from_enc(self, enc_cmd: BleAdvEncCmd, conf: BleAdvConfig) -> bytes:
         """Convert an encoder command and a config into a readable buffer."""
-        uid = conf.id.to_bytes(4, "little")
-        seed = conf.seed.to_bytes(2, "little")
-        return seed + bytes(
-            [
-                conf.tx_count,
-                conf.app_restart_count,
-                0x00,
-                0x10,
-                *uid,
-                enc_cmd.cmd,
-                enc_cmd.arg0,
-                enc_cmd.arg1,
-                enc_cmd.arg2,
-                conf.index,
-            ]
+        return _FRAME.pack(
+            conf.seed,
+            conf.tx_count,
+            conf.app_restart_count,
+            0x00,
+            0x10,
+            conf.id,
+            enc_cmd.cmd,
+            enc_cmd.arg0,
+            enc_cmd.arg1,
+            enc_cmd.arg2,
+            conf.index,
         )
 
 
+# arg2 bit mask of the changed attributes, and the changed attributes for each of the 32 arg2 values
+_FAN_CHG_BITS: tuple[tuple[int, str], ...] = (
+    (0x01, ATTR_SPEED),
+    (0x02, ATTR_DIR),
+    (0x04, ATTR_PRESET),
+    (0x08, ATTR_ON),
+    (0x10, ATTR_OSC),
+)
+_FAN_CHG_TABLE: tuple[tuple[str, ...], ...] = tuple(tuple(attr for mask, attr in _FAN_CHG_BITS if i & mask) for i in range(0x20))
+
+
 class AgarceFanTrans(Trans):
     """Argrace specific Fan Translator for complex args handling."""
 
@@ -144,27 +171,13 @@ class AgarceFanTrans(Trans):
         enc_cmd.arg0 |= 0x00 if ent_attr.attrs[ATTR_DIR] else 0x10
         enc_cmd.arg0 |= 0x20 if ent_attr.attrs[ATTR_PRESET] == ATTR_PRESET_BREEZE else 0x00
         enc_cmd.arg1 = int(ent_attr.attrs[ATTR_OSC])
-        enc_cmd.arg2 = 0x01 if ATTR_SPEED in ent_attr.chg_attrs else 0x00
-        enc_cmd.arg2 |= 0x02 if ATTR_DIR in ent_attr.chg_attrs else 0x00
-        enc_cmd.arg2 |= 0x04 if ATTR_PRESET in ent_attr.chg_attrs else 0x00
-        enc_cmd.arg2 |= 0x08 if ATTR_ON in ent_attr.chg_attrs else 0x00
-        enc_cmd.arg2 |= 0x10 if ATTR_OSC in ent_attr.chg_attrs else 0x00
+        enc_cmd.arg2 = sum(mask for mask, attr in _FAN_CHG_BITS if attr in ent_attr.chg_attrs)
         return enc_cmd
 
     def enc_to_ent(self, enc_cmd: BleAdvEncCmd) -> BleAdvEntAttr:
         """Apply transformations to Entity Attributes: reverse."""
         ent_attr = super().enc_to_ent(enc_cmd)
-        ent_attr.chg_attrs = []
-        if enc_cmd.arg2 & 0x01:
-            ent_attr.chg_attrs.append(ATTR_SPEED)
-        if enc_cmd.arg2 & 0x02:
-            ent_attr.chg_attrs.append(ATTR_DIR)
-        if enc_cmd.arg2 & 0x04:
-            ent_attr.chg_attrs.append(ATTR_PRESET)
-        if enc_cmd.arg2 & 0x08:
-            ent_attr.chg_attrs.append(ATTR_ON)
-        if enc_cmd.arg2 & 0x10:
-            ent_attr.chg_attrs.append(ATTR_OSC)
+        ent_attr.chg_attrs = list(_FAN_CHG_TABLE[enc_cmd.arg2 & 0x1F])
         ent_attr.attrs[ATTR_SPEED] = enc_cmd.arg0 & 0x0F
         ent_attr.attrs[ATTR_ON] = (enc_cmd.arg0 & 0x80) != 0
         ent_attr.attrs[ATTR_DIR] = (enc_cmd.arg0 & 0x10) == 0
@@ -1,7 +1,9 @@
 """Fanlamp Pro Encoders."""
 
+import struct
 from binascii import crc_hqx
-from typing import ClassVar
+from functools import cache, lru_cache
+from typing import TYPE_CHECKING, ClassVar, Self
 
 from Crypto.Cipher import AES
 
@@ -48,15 +50,23 @@ from .models import (
 from .models import EncoderMatcher as EncCmd
 from .utils import reverse_all, whiten
 
+if TYPE_CHECKING:
+    from Crypto.Cipher._mode_ecb import EcbMode
+
 
 class FanLampEncoder(BleAdvCodec):
     """Base Fanlamp encoder."""
 
     _len = 24
 
-    def _crc16(self, buffer: bytes, seed: int) -> int:
-        """CRC16 CCITT computing."""
-        return crc_hqx(buffer, seed)
+    # CRC16 CCITT computing: binascii crc_hqx is already table driven C code, bound directly to skip a Python call level
+    _crc16 = staticmethod(crc_hqx)
+
+
+@cache
+def _crc2_seed(prefix: bytes) -> int:
+    """CRC2 seed of a V1 prefix, shared by all the codecs with the same prefix."""
+    return crc_hqx(prefix, 0xFFFF)
 
 
 class FanLampEncoderV1Base(FanLampEncoder):
@@ -68,21 +78,32 @@ class FanLampEncoderV1Base(FanLampEncoder):
         self._prefix = bytearray([0xAA, 0x98, 0x43, 0xAF, 0x0B, 0x46, 0x46, 0x46])
         if supp_prefix != 0:
             self._prefix.insert(0, supp_prefix)
-        self._crc2_seed = self._crc16(self._prefix[1:6], 0xFFFF)
+        self._crc2_seed = _crc2_seed(bytes(self._prefix[1:6]))
         self._forced_crc2 = forced_crc2
         self._with_crc2 = (self._forced_crc2 != 0) or (supp_prefix == 0)
+        # whitening seed is constant: the whitening stream for the full buffer is computed once, in both bit orders
+        whitening = whiten(bytes(self._len), 0x6F)
+        self._whitening = int.from_bytes(whitening)
+        self._whitening_rev = int.from_bytes(reverse_all(whitening))
 
     def _crc2(self, buffer: bytes) -> int:
         """Compute CRC 2 as ccitt crc16."""
         return self._forced_crc2 if self._forced_crc2 != 0 else self._crc16(buffer, self._crc2_seed)
 
     def decrypt(self, buffer: bytes) -> bytes | None:
-        """Decrypt / unwhiten an incoming raw buffer into a readable buffer."""
-        return reverse_all(whiten(buffer, 0x6F))
+        """Decrypt / unwhiten an incoming raw buffer into a readable buffer.
+
+        Bit reversal distributes over XOR: reverse(buffer ^ whitening) == reverse(buffer) ^ reverse(whitening).
+        """
+        return (int.from_bytes(reverse_all(buffer)) ^ self._whitening_rev).to_bytes(self._len)
 
     def encrypt(self, buffer: bytes) -> bytes:
         """Encrypt / whiten a readable buffer."""
-        return whiten(reverse_all(buffer), 0x6F)
+        return (int.from_bytes(reverse_all(buffer)) ^ self._whitening).to_bytes(self._len)
+
+
+# V1b decoded frames: cmd, id (uint16 little endian), arg0, arg1, arg2, frame index, param, 2 bytes (id high / low), 4 bytes flags
+_V1B_FRAME = struct.Struct("<BHBBBBBBBBBBB")
 
 
 class FanLampEncoderV1b(FanLampEncoderV1Base):
@@ -112,18 +133,23 @@ class FanLampEncoderV1b(FanLampEncoderV1Base):
 
     def convert_multi_from_enc(self, enc_cmd: BleAdvEncCmd, conf: BleAdvConfig) -> list[bytes]:
         """Convert an encoder command and a config into a list of readable buffers."""
-        uid = conf.id.to_bytes(2, "little")
-        rev_uid = conf.id.to_bytes(2, "big")
-        base_buffer = [enc_cmd.cmd, *uid, enc_cmd.arg0, enc_cmd.arg1, enc_cmd.arg2]
+        hi, lo = (conf.id >> 8) & 0xFF, conf.id & 0xFF
+        base = (enc_cmd.cmd, conf.id, enc_cmd.arg0, enc_cmd.arg1, enc_cmd.arg2)
         buffers = [
-            bytes([*base_buffer, 0x00, enc_cmd.param, 0x02, 0x00, 0x00, 0x00, 0x01, 0x00]),
-            bytes([*base_buffer, 0x01, enc_cmd.param, *rev_uid, 0x00, 0x00, 0x01, 0x01]),
-            bytes([*base_buffer, 0x02, enc_cmd.param, *rev_uid, 0x00, 0x00, 0x02, 0x00]),
-            bytes([*base_buffer, 0x03, enc_cmd.param, *rev_uid, 0x00, 0x00, 0x03, 0x00]),
+            _V1B_FRAME.pack(*base, 0x00, enc_cmd.param, 0x02, 0x00, 0x00, 0x00, 0x01, 0x00),
+            _V1B_FRAME.pack(*base, 0x01, enc_cmd.param, hi, lo, 0x00, 0x00, 0x01, 0x01),
+            _V1B_FRAME.pack(*base, 0x02, enc_cmd.param, hi, lo, 0x00, 0x00, 0x02, 0x00),
+            _V1B_FRAME.pack(*base, 0x03, enc_cmd.param, hi, lo, 0x00, 0x00, 0x03, 0x00),
         ]
         return [buf + self._crc2(buf).to_bytes(2) for buf in buffers]
 
 
+# V1 decoded frames: cmd, group / index (uint16 little endian), arg0, arg1, arg2, tx_count, param, id ^ seed, seed ^ r2
+_V1_FRAME = struct.Struct("<BHBBBBBBB")
+# followed by the seed and the CRC, both uint16 big endian
+_V1_SEED_CRC = struct.Struct(">HH")
+
+
 class FanLampEncoderV1(FanLampEncoderV1Base):
     """FanLamp V1 encoder."""
 
@@ -133,58 +159,66 @@ class FanLampEncoderV1(FanLampEncoderV1Base):
         """Init with args."""
         super().__init__(supp_prefix, forced_crc2)
         self._arg2 = arg2
-        self._arg2_only_on_pair = arg2_only_on_pair
         self._xor1 = xor1
+        # arg2 forced value per cmd, None when the arg2 of the command is kept
+        self._arg2_lut: tuple[int | None, ...] = tuple(
+            None if cmd == 0x22 else arg2 if (cmd == 0x28 or (not arg2_only_on_pair and cmd not in [0x12, 0x13, 0x1E, 0x1F])) else 0
+            for cmd in range(256)
+        )
 
     def _get_arg2(self, cmd: int, arg2: int) -> int:
-        return arg2 if cmd == 0x22 else self._arg2 if (cmd == 0x28 or (not self._arg2_only_on_pair and cmd not in [0x12, 0x13, 0x1E, 0x1F])) else 0
+        forced_arg2 = self._arg2_lut[cmd]
+        return arg2 if forced_arg2 is None else forced_arg2
 
     def convert_to_enc(self, decoded: bytes) -> tuple[BleAdvEncCmd | None, BleAdvConfig | None]:
         """Convert a readable buffer into an encoder command and a config."""
-        seed = int.from_bytes(decoded[10:12])
+        cmd, group_index, arg0, arg1, arg2, tx_count, param, id_seed, r2 = _V1_FRAME.unpack_from(decoded)
+        seed, crc = _V1_SEED_CRC.unpack_from(decoded, _V1_FRAME.size)
         seed8 = seed & 0xFF
         if (
-            not self.is_eq(self._crc16(decoded[:12], seed ^ 0xFFFF), int.from_bytes(decoded[12:14]), "CRC")
-            or not self.is_eq(self._get_arg2(decoded[0], decoded[5]), decoded[5], "Arg2")
-            or not self.is_eq(seed8 ^ 1 if self._xor1 else seed8, decoded[9], "r2")
+            not self.is_eq(self._crc16(decoded[:12], seed ^ 0xFFFF), crc, "CRC")
+            or not self.is_eq(self._get_arg2(cmd, arg2), arg2, "Arg2")
+            or not self.is_eq(seed8 ^ 1 if self._xor1 else seed8, r2, "r2")
             or (self._with_crc2 and not self.is_eq(self._crc2(decoded[:-2]), int.from_bytes(decoded[14:16]), "CRC2"))
         ):
             return None, None
 
         conf = BleAdvConfig()
-        group_index = int.from_bytes(decoded[1:3], "little")
         conf.index = (group_index & 0x0F00) >> 8
-        conf.id = (group_index & 0xF0FF) | ((seed8 ^ decoded[8]) << 16)
-        conf.tx_count = decoded[6]
+        conf.id = (group_index & 0xF0FF) | ((seed8 ^ id_seed) << 16)
+        conf.tx_count = tx_count
         conf.seed = seed
 
-        enc_cmd = BleAdvEncCmd(decoded[0])
-        if enc_cmd.cmd != 0x28:
-            enc_cmd.param = decoded[7]
-            enc_cmd.arg0 = decoded[3]
-            enc_cmd.arg1 = decoded[4]
-            if enc_cmd.cmd == 0x22:
-                enc_cmd.arg2 = decoded[5]
+        enc_cmd = BleAdvEncCmd(cmd)
+        if cmd != 0x28:
+            enc_cmd.param = param
+            enc_cmd.arg0 = arg0
+            enc_cmd.arg1 = arg1
+            if cmd == 0x22:
+                enc_cmd.arg2 = arg2
         else:
-            enc_cmd.param = 0x00 if self._arg2 == 0x00 else decoded[7]
-            if not self.is_eq(conf.id & 0xFF, decoded[3], "Pair Arg0") or not self.is_eq((conf.id >> 8) & 0xF0, decoded[4], "Pair Arg1"):
+            enc_cmd.param = 0x00 if self._arg2 == 0x00 else param
+            if not self.is_eq(conf.id & 0xFF, arg0, "Pair Arg0") or not self.is_eq((conf.id >> 8) & 0xF0, arg1, "Pair Arg1"):
                 return None, None
         return enc_cmd, conf
 
     def convert_from_enc(self, enc_cmd: BleAdvEncCmd, conf: BleAdvConfig) -> bytes:
         """Convert an encoder command and a config into a readable buffer."""
         is_pair_cmd: bool = enc_cmd.cmd == 0x28
-        obuf = bytearray()
-        obuf.append(enc_cmd.cmd)
-        obuf += ((conf.id & 0xF0FF) | ((conf.index & 0x0F) << 8)).to_bytes(2, "little")
-        obuf.append(conf.id & 0xFF if is_pair_cmd else enc_cmd.arg0)
-        obuf.append((conf.id >> 8) & 0xF0 if is_pair_cmd else enc_cmd.arg1)
-        obuf.append(self._get_arg2(enc_cmd.cmd, enc_cmd.arg2))
-        obuf.append(conf.tx_count)
-        obuf.append(self._header[0] if (self._arg2 == 0x00 and is_pair_cmd) else enc_cmd.param)
         seed8 = conf.seed & 0xFF
-        obuf.append(seed8 ^ 1 if self._xor1 else seed8 ^ ((conf.id >> 16) & 0xFF))
-        obuf.append(seed8 ^ 1 if self._xor1 else seed8)
+        obuf = bytearray(
+            _V1_FRAME.pack(
+                enc_cmd.cmd,
+                (conf.id & 0xF0FF) | ((conf.index & 0x0F) << 8),
+                conf.id & 0xFF if is_pair_cmd else enc_cmd.arg0,
+                (conf.id >> 8) & 0xF0 if is_pair_cmd else enc_cmd.arg1,
+                self._get_arg2(enc_cmd.cmd, enc_cmd.arg2),
+                conf.tx_count,
+                self._header[0] if (self._arg2 == 0x00 and is_pair_cmd) else enc_cmd.param,
+                seed8 ^ 1 if self._xor1 else seed8 ^ ((conf.id >> 16) & 0xFF),
+                seed8 ^ 1 if self._xor1 else seed8,
+            )
+        )
         obuf += conf.seed.to_bytes(2)
         obuf += self._crc16(obuf, conf.seed ^ 0xFFFF).to_bytes(2)
         if self._with_crc2:
@@ -194,12 +228,21 @@ class FanLampEncoderV1(FanLampEncoderV1Base):
         return obuf
 
 
+# V2 encrypted frames end with the seed and the CRC, both uint16 little endian
+_V2_TRAILER = struct.Struct("<HH")
+_V2_UINT16 = struct.Struct("<H")
+# the whitened part of V2 frames ends with the sign (uint16 little endian) and a 0 byte
+_V2_SIGN = struct.Struct("<Hx")
+# V2 decoded frames: tx_count, device_type, id, index, cmd, (unused), param, arg0, arg1, arg2, seed (artificially pushed at the end)
+_V2_FRAME = struct.Struct("<BHIBBxBBBBH")
+
+
 class FanLampEncoderV2(FanLampEncoder):
     """FanLamp V2 encoder."""
 
     _seed_max = 0xFFF5
 
-    XBOXES: ClassVar[list[int]] = [
+    XBOXES: ClassVar[bytes] = bytes([
         0xB7, 0xFD, 0x93, 0x26, 0x36, 0x3F, 0xF7, 0xCC, 0x34, 0xA5, 0xE5, 0xF1, 0x71, 0xD8, 0x31, 0x15,
         0x04, 0xC7, 0x23, 0xC3, 0x18, 0x96, 0x05, 0x9A, 0x07, 0x12, 0x80, 0xE2, 0xEB, 0x27, 0xB2, 0x75,
         0xD0, 0xEF, 0xAA, 0xFB, 0x43, 0x4D, 0x33, 0x85, 0x45, 0xF9, 0x02, 0x7F, 0x50, 0x3C, 0x9F, 0xA8,
@@ -208,79 +251,96 @@ class FanLampEncoderV2(FanLampEncoder):
         0xE7, 0xC8, 0x37, 0x6D, 0x8D, 0xD5, 0x4E, 0xA9, 0x6C, 0x56, 0xF4, 0xEA, 0x65, 0x7A, 0xAE, 0x08,
         0xE1, 0xF8, 0x98, 0x11, 0x69, 0xD9, 0x8E, 0x94, 0x9B, 0x1E, 0x87, 0xE9, 0xCE, 0x55, 0x28, 0xDF,
         0x8C, 0xA1, 0x89, 0x0D, 0xBF, 0xE6, 0x42, 0x68, 0x41, 0x99, 0x2D, 0x0F, 0xB0, 0x54, 0xBB, 0x16,
-    ]  # fmt: skip
+    ])  # fmt: skip
 
     def __init__(self, device_type: int, with_sign: bool) -> None:
         """Init with args."""
         super().__init__()
         self._device_type = device_type
         self._with_sign = with_sign
+        self._clear_prefix = b""
+        self._salt = 0
+
+    def prefix(self, prefix: list[int]) -> Self:
+        """Set prefix, its first 2 bytes are not whitened and can be checked before any decrypt step."""
+        self._clear_prefix = bytes(prefix[:2])
+        self._salt = (prefix[1] & 0x3) << 5
+        return super().prefix(prefix)
+
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def _whitening(seed: int, salt: int, buf_len: int) -> int:
+        """Compute the whitening stream of a seed / salt, as a big integer of buf_len bytes."""
+        return int.from_bytes(bytes([FanLampEncoderV2.XBOXES[((seed + i + 9) & 0x1F) + salt] ^ seed for i in range(buf_len)]))
 
     def _whiten(self, buffer: bytes, seed: int) -> bytes:
-        """Whiten / Unwhiten buffer with seed."""
-        obuf = []
-        salt = (self._prefix[1] & 0x3) << 5
-        for i, val in enumerate(buffer):
-            obuf.append((self.XBOXES[((seed + i + 9) & 0x1F) + salt]) ^ seed ^ val)
-        return bytes(obuf)
+        """Whiten / Unwhiten buffer with seed, its first 2 bytes are kept clear.
+
+        The whitening stream is aligned on the end of the buffer: as an integer its 2 missing leading bytes are 0.
+        """
+        buf_len = len(buffer)
+        return (int.from_bytes(buffer) ^ self._whitening(seed, self._salt, buf_len - 2)).to_bytes(buf_len)
+
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def _sign_cipher(tx_count: int, seed: int) -> "EcbMode":
+        """Get the AES ECB cipher of a tx_count / seed: the key schedule is only computed once."""
+        key = bytes([seed & 0xFF, (seed >> 8) & 0xFF, tx_count, 0x0D, 0xBF, 0xE6, 0x42, 0x68, 0x41, 0x99, 0x2D, 0x0F, 0xB0, 0x54, 0xBB, 0x16])
+        return AES.new(key, AES.MODE_ECB)
 
     def _sign(self, buffer: bytes, tx_count: int, seed: int) -> int:
         """Compute uint16 AES ECB sign."""
-        key = bytes([seed & 0xFF, (seed >> 8) & 0xFF, tx_count, 0x0D, 0xBF, 0xE6, 0x42, 0x68, 0x41, 0x99, 0x2D, 0x0F, 0xB0, 0x54, 0xBB, 0x16])
-        cipher = AES.new(key, AES.MODE_ECB)
-        ciphertext = cipher.encrypt(buffer)
+        ciphertext = self._sign_cipher(tx_count, seed).encrypt(buffer)
         sign = int.from_bytes(ciphertext[0:2], "little")
         return sign if sign != 0 else 0xFFFF
 
     def decrypt(self, buffer: bytes) -> bytes | None:
         """Decrypt / unwhiten an incoming raw buffer into a readable buffer."""
-        seed = int.from_bytes(buffer[-4:-2], "little")
-        crc_msg = int.from_bytes(buffer[-2:], "little")
-        crc_computed = self._crc16(buffer[:-2], seed ^ 0xFFFF)
-        decoded_base = buffer[0:2] + self._whiten(buffer[2:-5], seed & 0xFF)
+        if not self.is_eq_buf(self._clear_prefix, buffer, "Prefix"):
+            return None
+        seed, crc_msg = _V2_TRAILER.unpack_from(buffer, len(buffer) - _V2_TRAILER.size)
+        # CRC is computed on the raw buffer: check it before unwhitening and signing
+        if not self.is_eq(self._crc16(buffer[:-2], seed ^ 0xFFFF), crc_msg, "CRC"):
+            return None
+        decoded_base = self._whiten(buffer[:-5], seed & 0xFF)
         sign = int.from_bytes(decoded_base[-2:], "little")
-        if (
-            not self.is_eq(crc_computed, crc_msg, "CRC")
-            or (self._with_sign and not self.is_eq(self._sign(decoded_base[1:17], decoded_base[3], seed), sign, "Sign"))
-            or (not self._with_sign and not self.is_eq(0, sign, "NO Sign"))
-        ):
+        if self._with_sign:
+            if not self.is_eq(self._sign(decoded_base[1:17], decoded_base[3], seed), sign, "Sign"):
+                return None
+        elif not self.is_eq(0, sign, "NO Sign"):
             return None
         return decoded_base[:-2] + buffer[-4:-2]  # seed artificially pushed at the end of decoded buffer
 
     def encrypt(self, decoded: bytes) -> bytes:
         """Encrypt / whiten a readable buffer."""
-        seed = int.from_bytes(decoded[-2:], "little")  # seed artificially pushed at the end of decoded buffer
-        obuf = bytearray(decoded[:-2])
-        obuf += (self._sign(bytes(obuf[1:17]), obuf[3], seed) if self._with_sign else 0).to_bytes(2, "little")
-        obuf.append(0)
-        obuf = bytearray(obuf[0:2]) + self._whiten(obuf[2:], seed & 0xFF)
-        obuf += seed.to_bytes(2, "little")
-        obuf += self._crc16(obuf, seed ^ 0xFFFF).to_bytes(2, "little")
-        return obuf
+        seed = _V2_UINT16.unpack_from(decoded, len(decoded) - 2)[0]  # seed artificially pushed at the end of decoded buffer
+        sign = self._sign(bytes(decoded[1:17]), decoded[3], seed) if self._with_sign else 0
+        whitened = self._whiten(decoded[:-2] + _V2_SIGN.pack(sign), seed & 0xFF)
+        return whitened + _V2_TRAILER.pack(seed, self._crc16(whitened + _V2_UINT16.pack(seed), seed ^ 0xFFFF))
 
     def convert_to_enc(self, decoded: bytes) -> tuple[BleAdvEncCmd | None, BleAdvConfig | None]:
         """Convert a readable buffer into an encoder command and a config."""
-        if not self.is_eq(self._device_type, int.from_bytes(decoded[1:3], "little"), "Device Type"):
+        tx_count, device_type, uid, index, cmd, param, arg0, arg1, arg2, seed = _V2_FRAME.unpack_from(decoded)
+        if not self.is_eq(self._device_type, device_type, "Device Type"):
             return None, None
 
         conf = BleAdvConfig()
-        conf.seed = int.from_bytes(decoded[-2:], "little")  # seed artificially pushed at the end of decoded buffer
-        conf.tx_count = decoded[0]
-        conf.id = int.from_bytes(decoded[3:7], "little")
-        conf.index = decoded[7]
-        enc_cmd = BleAdvEncCmd(decoded[8])
-        enc_cmd.param = decoded[10]
-        enc_cmd.arg0 = decoded[11]
-        enc_cmd.arg1 = decoded[12]
-        enc_cmd.arg2 = decoded[13]
+        conf.seed = seed
+        conf.tx_count = tx_count
+        conf.id = uid
+        conf.index = index
+        enc_cmd = BleAdvEncCmd(cmd)
+        enc_cmd.param = param
+        enc_cmd.arg0 = arg0
+        enc_cmd.arg1 = arg1
+        enc_cmd.arg2 = arg2
         return enc_cmd, conf
 
     def convert_from_enc(self, enc_cmd: BleAdvEncCmd, conf: BleAdvConfig) -> bytes:
         """Convert an encoder command and a config into a readable buffer."""
-        dt = self._device_type.to_bytes(2, "little")
-        uid = conf.id.to_bytes(4, "little")
-        seed = conf.seed.to_bytes(2, "little")  # seed artificially pushed at the end of decoded buffer
-        return bytes([conf.tx_count, *dt, *uid, conf.index, enc_cmd.cmd, 0, enc_cmd.param, enc_cmd.arg0, enc_cmd.arg1, enc_cmd.arg2, *seed])
+        return _V2_FRAME.pack(
+            conf.tx_count, self._device_type, conf.id, conf.index, enc_cmd.cmd, enc_cmd.param, enc_cmd.arg0, enc_cmd.arg1, enc_cmd.arg2, conf.seed
+        )
 
 
 def _get_fan_translators() -> list[Trans]:
@@ -36,15 +36,16 @@ class LeEncoder(BleAdvCodec):
     """LE encoder."""
 
     _len = 21
-    XBOXES: ClassVar[list[int]] = [0xCB, 0x6A, 0x95, 0x8D, 0xB6, 0x7B, 0x35, 0x5A, 0x6E, 0x49, 0x5C, 0x85, 0x37, 0x3C, 0xA6, 0x88]
+    XBOXES: ClassVar[bytes] = bytes([0xCB, 0x6A, 0x95, 0x8D, 0xB6, 0x7B, 0x35, 0x5A, 0x6E, 0x49, 0x5C, 0x85, 0x37, 0x3C, 0xA6, 0x88])
+    # xor with each of the XBOXES values as bytes.translate tables
+    _XOR_TABLES: ClassVar[tuple[bytes, ...]] = tuple(bytes(x ^ xora for x in range(256)) for xora in XBOXES)
 
     def _checksum(self, buffer: bytes) -> int:
         return ((sum(buffer) + 1) & 0xFF) ^ 0xFF
 
     def encode(self, buffer: bytes, salt: int) -> bytes:
         """Encode by xor and salt."""
-        xora = self.XBOXES[salt & 15]
-        return bytearray([x ^ xora for x in buffer])
+        return buffer.translate(self._XOR_TABLES[salt & 15])
 
     def decrypt(self, buffer: bytes) -> bytes | None:
         """Decrypt / unwhiten an incoming raw buffer into a readable buffer."""
@@ -1,5 +1,8 @@
 """Mantra Lighting Application."""
 
+import struct
+from functools import cache, lru_cache
+
 from .const import (
     ATTR_BR,
     ATTR_CMD,
@@ -27,6 +30,7 @@ from .models import (
     BleAdvEntAttr,
     CTLightCmd,
     DeviceCmd,
+    EntityMatcher,
     Fan6SpeedCmd,
     Fan8SpeedCmd,
     FanCmd,
@@ -37,6 +41,52 @@ from .models import (
 from .models import EncoderMatcher as EncCmd
 
 
+def _lfsr16(r: int, param: int, nb_bytes: int) -> tuple[int, bytes]:
+    """Run the 16 bits LFSR bit by bit from state r: return the final state and the produced bytes."""
+    obuf = bytearray(nb_bytes)
+    for i in range(nb_bytes):
+        b = 0
+        for j in range(8):
+            high_bit = r >> 15
+            r = ((r << 1) & 0xFFFF) ^ (param & -high_bit)
+            b |= high_bit << (7 - j)
+            if r == 0:
+                r = 1061
+        obuf[i] = b
+    return r, bytes(obuf)
+
+
+@cache
+def _lfsr16_step8(param: int) -> tuple[tuple[int, int], ...]:
+    """Compute the 8 steps LFSR transition table, indexed by the state high byte.
+
+    The low byte of the state only reaches the high bit after 8 steps: the produced byte only depends on the high byte,
+    and the low byte is shifted into the new state without feedback, so new_state = table[high][0] ^ (low << 8).
+    """
+    # a null high byte gives no feedback at all: the null state reset must not be applied there
+    return ((0, 0), *((state, b[0]) for state, b in (_lfsr16(high << 8, param, 1) for high in range(1, 256))))
+
+
+@lru_cache(maxsize=1024)
+def _whitening16(seed: int, buf_len: int, param: int, xorer: int) -> int:
+    """Compute the 16 bits LFSR whitening stream of a seed, as a big integer of buf_len bytes."""
+    if seed == 0 or (param & 1) == 0:
+        # the null state reset only happens from a null seed, or with an even param
+        return int.from_bytes(bytes(xorer ^ b for b in _lfsr16(seed, param, buf_len)[1]))
+    step8 = _lfsr16_step8(param)
+    obuf = bytearray(buf_len)
+    r = seed
+    for i in range(buf_len):
+        state, b = step8[r >> 8]
+        r = state ^ ((r & 0xFF) << 8)
+        obuf[i] = xorer ^ b
+    return int.from_bytes(obuf)
+
+
+# Mantra decoded frames: index / tx_count, 0x06, cmd, family, id, param, arg0 to arg4
+_FRAME = struct.Struct(">HBB4sHBBBBBB")
+
+
 class MantraEncoder(BleAdvCodec):
     """Mantra encoder."""
 
@@ -47,82 +97,83 @@ class MantraEncoder(BleAdvCodec):
     _tx_max: int = 0x0FFF
     _family = bytes([0x12, 0x34, 0x56, 0x78])
 
-    def _whiten16(self, buffer: bytes, seed: int, param: int = 4777, xorer: int = 73) -> bytearray:
-        obuf = bytearray()
-        r = seed
-        for val in buffer:
-            b = 0
-            for j in range(8):
-                high_bit = 0x8000 & r
-                r = (r << 1) & 0xFFFF
-                if high_bit != 0:
-                    r ^= param
-                    b |= 1 << (7 - j)
-                if r == 0:
-                    r = 1061
-            obuf.append(val ^ xorer ^ b)
-        return obuf
+    def _whiten16(self, buffer: bytes, seed: int, param: int = 4777, xorer: int = 73) -> bytes:
+        buf_len = len(buffer)
+        return (int.from_bytes(buffer) ^ _whitening16(seed, buf_len, param, xorer)).to_bytes(buf_len)
 
     def decrypt(self, buffer: bytes) -> bytes | None:
         """Decrypt / unwhiten an incoming raw buffer into a readable buffer."""
-        obuf = bytearray(buffer[:5])
-        obuf += self._whiten16(buffer[5:], int.from_bytes(buffer[2:4]))
-        return obuf
+        return buffer[:5] + self._whiten16(buffer[5:], int.from_bytes(buffer[2:4]))
 
     def encrypt(self, buffer: bytes) -> bytes:
         """Encrypt / whiten a readable buffer."""
-        obuf = bytearray(buffer[:5])
-        obuf += self._whiten16(buffer[5:], int.from_bytes(buffer[2:4]))
-        return obuf
+        return buffer[:5] + self._whiten16(buffer[5:], int.from_bytes(buffer[2:4]))
 
     def convert_to_enc(self, decoded: bytes) -> tuple[BleAdvEncCmd | None, BleAdvConfig | None]:
         """Convert a readable buffer into an encoder command and a config."""
-        if not self.is_eq(0x06, decoded[2], "2 as 0x06") or not self.is_eq_buf(self._family, decoded[4:8], "Family"):
+        count, six, cmd, family, uid, param, arg0, arg1, arg2, arg3, arg4 = _FRAME.unpack_from(decoded)
+        if not self.is_eq(0x06, six, "2 as 0x06") or not self.is_eq_buf(self._family, family, "Family"):
             return None, None
 
         conf = BleAdvConfig()
-        conf.tx_count = int.from_bytes(decoded[0:2])
-        conf.index = (conf.tx_count & 0xF000) >> 12
-        conf.tx_count = conf.tx_count & 0x0FFF
-        conf.id = int.from_bytes(decoded[8:10])
-
-        enc_cmd = BleAdvEncCmd(decoded[3])
-        enc_cmd.param = decoded[10]
-        enc_cmd.arg0 = decoded[11]
-        enc_cmd.arg1 = decoded[12]
-        enc_cmd.arg2 = decoded[13]
-        enc_cmd.arg3 = decoded[14]
-        enc_cmd.arg4 = decoded[15]
+        conf.index = (count & 0xF000) >> 12
+        conf.tx_count = count & 0x0FFF
+        conf.id = uid
+
+        enc_cmd = BleAdvEncCmd(cmd)
+        enc_cmd.param = param
+        enc_cmd.arg0 = arg0
+        enc_cmd.arg1 = arg1
+        enc_cmd.arg2 = arg2
+        enc_cmd.arg3 = arg3
+        enc_cmd.arg4 = arg4
 
         return enc_cmd, conf
 
     def convert_from_enc(self, enc_cmd: BleAdvEncCmd, conf: BleAdvConfig) -> bytes:
         """Convert an encoder command and a config into a readable buffer."""
-        count = (conf.tx_count + (conf.index << 12)).to_bytes(2)
-        uid = conf.id.to_bytes(2)
-        return bytes(
-            [*count, 0x06, enc_cmd.cmd, *self._family, *uid, enc_cmd.param, enc_cmd.arg0, enc_cmd.arg1, enc_cmd.arg2, enc_cmd.arg3, enc_cmd.arg4]
+        return _FRAME.pack(
+            conf.tx_count + (conf.index << 12),
+            0x06,
+            enc_cmd.cmd,
+            self._family,
+            conf.id,
+            enc_cmd.param,
+            enc_cmd.arg0,
+            enc_cmd.arg1,
+            enc_cmd.arg2,
+            enc_cmd.arg3,
+            enc_cmd.arg4,
         )
 
 
+# Remote fixed composed arg0 / arg1: attribute and its extractor from the encoder command
+_REMOTE_EXTRACTORS = (
+    (ATTR_BR, lambda enc_cmd: max(((enc_cmd.arg0 & 0x0F) - 1) / 10.0, 0.01)),
+    (ATTR_CT_REV, lambda enc_cmd: ((enc_cmd.arg0 & 0x70) >> 4) / 7.0),
+    (ATTR_DIR, lambda enc_cmd: not ((enc_cmd.arg1 >> 6) & 1)),
+    (ATTR_SPEED, lambda enc_cmd: enc_cmd.arg1 & 0x0F),
+    (ATTR_PRESET, lambda enc_cmd: ATTR_PRESET_BREEZE if (enc_cmd.arg1 >> 5) & 1 else ATTR_PRESET_SLEEP if (enc_cmd.arg1 >> 4) & 1 else None),
+)
+
+
 class TransRemote(Trans):
     """Specific translator for Remote fixed composed arg0 and arg1."""
 
     direct = False
 
+    def __init__(self, ent: EntityMatcher, enc: EncCmd) -> None:
+        """Init with the extractors of the changed attributes."""
+        super().__init__(ent, enc)
+        # the changed attributes are fixed by the entity matcher: only keep their extractors
+        chg_attrs = ent.create().chg_attrs
+        self._extractors = tuple((attr, extractor) for attr, extractor in _REMOTE_EXTRACTORS if attr in chg_attrs)
+
     def enc_to_ent(self, enc_cmd: BleAdvEncCmd) -> BleAdvEntAttr:
         """Overload for complex attribute handling."""
         ent_attr = super().enc_to_ent(enc_cmd)
-        if ATTR_BR in ent_attr.chg_attrs:
-            ent_attr.attrs[ATTR_BR] = max(((enc_cmd.arg0 & 0x0F) - 1) / 10.0, 0.01)
-        if ATTR_CT_REV in ent_attr.chg_attrs:
-            ent_attr.attrs[ATTR_CT_REV] = ((enc_cmd.arg0 & 0x70) >> 4) / 7.0
-        if ATTR_DIR in ent_attr.chg_attrs:
-            ent_attr.attrs[ATTR_DIR] = not ((enc_cmd.arg1 >> 6) & 1)
-        if ATTR_SPEED in ent_attr.chg_attrs:
-            ent_attr.attrs[ATTR_SPEED] = enc_cmd.arg1 & 0x0F
-        if ATTR_PRESET in ent_attr.chg_attrs:
-            ent_attr.attrs[ATTR_PRESET] = ATTR_PRESET_BREEZE if (enc_cmd.arg1 >> 5) & 1 else ATTR_PRESET_SLEEP if (enc_cmd.arg1 >> 4) & 1 else None
+        for attr, extractor in self._extractors:
+            ent_attr.attrs[attr] = extractor(enc_cmd)
         return ent_attr
 
 
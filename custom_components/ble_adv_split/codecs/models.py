@@ -67,8 +67,8 @@ class BleAdvAdvertisement:
 
     def to_raw(self) -> bytes:
         """Get the raw buffer."""
-        full_raw = bytearray([len(self.raw) + 1, self.ble_type]) + self.raw if self.ble_type != 0 else self.raw
-        return full_raw if self.ad_flag == 0 else bytearray([0x02, 0x01, self.ad_flag]) + full_raw
+        full_raw = bytes((len(self.raw) + 1, self.ble_type)) + self.raw if self.ble_type != 0 else bytes(self.raw)
+        return full_raw if self.ad_flag == 0 else bytes((0x02, 0x01, self.ad_flag)) + full_raw
 
 
 @dataclass
@@ -184,6 +184,11 @@ class EntityMatcher(CommonMatcher):
     def __repr__(self) -> str:
         return f"{self._base_type}_{self._index} / {self._actions}"
 
+    @property
+    def id(self) -> tuple[str, int]:
+        """Matched Entity ID."""
+        return (self._base_type, self._index)
+
     def act(self, action: str, action_value: AttrType = None) -> Self:
         """Match Activity on given attribute, with value."""
         self._actions.append(action)
@@ -321,13 +326,19 @@ class EncoderMatcher(CommonMatcher):
     def __repr__(self) -> str:
         return f"cmd: 0x{self._cmd:02X}"
 
+    @property
+    def cmd(self) -> int:
+        """Encoder cmd matched."""
+        return self._cmd
+
     def matches(self, enc_cmd: BleAdvEncCmd) -> bool:
         """Match with Encoder Attributes."""
+        # empty checks are skipped: most matchers only have equality checks
         return (
             (enc_cmd.cmd == self._cmd)
-            and all(getattr(enc_cmd, attr) == val for attr, val in self.eqs.items())
-            and all(getattr(enc_cmd, attr) >= val for attr, val in self.mins.items())
-            and all(getattr(enc_cmd, attr) <= val for attr, val in self.maxs.items())
+            and (not self.eqs or all(getattr(enc_cmd, attr) == val for attr, val in self.eqs.items()))
+            and (not self.mins or all(getattr(enc_cmd, attr) >= val for attr, val in self.mins.items()))
+            and (not self.maxs or all(getattr(enc_cmd, attr) <= val for attr, val in self.maxs.items()))
         )
 
     def create(self) -> BleAdvEncCmd:
@@ -432,6 +443,8 @@ class BleAdvCodec(ABC):
         self._ble_type: int = 0
         self._ad_flag: int = 0
         self._translators: list[Trans] = []
+        self._dir_translators: dict[tuple[str, int], list[Trans]] = {}  # direct translators indexed by entity id
+        self._rev_translators: dict[int, list[Trans]] = {}  # reverse translators indexed by encoder cmd
 
     @abstractmethod
     def decrypt(self, buffer: bytes) -> bytes | None:
@@ -486,14 +499,24 @@ class BleAdvCodec(ABC):
         self._ble_type = ble_type
         return self
 
+    def _index_translators(self, translators: list[Trans]) -> None:
+        for trans in translators:
+            if trans.direct:
+                self._dir_translators.setdefault(trans.ent.id, []).append(trans)
+            if trans.reverse:
+                self._rev_translators.setdefault(trans.enc.cmd, []).append(trans)
+
     def add_translators(self, translators: list[Trans]) -> Self:
         """Add Translators."""
         self._translators.extend(translators)
+        self._index_translators(translators)
         return self
 
     def add_rev_only_trans(self, translators: list[Trans]) -> Self:
         """Add Reverse Only Translators."""
-        self._translators.extend([copy.copy(trans).no_direct() for trans in translators if trans.reverse])
+        rev_translators = [copy.copy(trans).no_direct() for trans in translators if trans.reverse]
+        self._translators.extend(rev_translators)
+        self._index_translators(rev_translators)
         return self
 
     def get_supported_features(self, base_type: str) -> list[dict[str, set[Any]]]:
@@ -521,11 +544,18 @@ class BleAdvCodec(ABC):
 
     def ent_to_enc(self, ent_attr: BleAdvEntAttr) -> list[BleAdvEncCmd]:
         """Convert Entity Attributes to list of Encoder Attributes."""
-        return [trans.ent_to_enc(ent_attr) for trans in self._translators if trans.matches_ent(ent_attr)]
+        # only the translators of the same entity can match: no need to check the others
+        return [trans.ent_to_enc(ent_attr) for trans in self._dir_translators.get(ent_attr.id, ()) if trans.matches_ent(ent_attr)]
 
     def enc_to_ent(self, enc_cmd: BleAdvEncCmd) -> list[BleAdvEntAttr]:
         """Convert Encoder Attributes to list of Entity Attributes."""
-        return [trans.enc_to_ent(enc_cmd) for trans in self._translators if trans.matches_enc(enc_cmd)]
+        # only the translators of the same cmd can match: no need to check the others
+        return [trans.enc_to_ent(enc_cmd) for trans in self._rev_translators.get(enc_cmd.cmd, ()) if trans.matches_enc(enc_cmd)]
+
+    @property
+    def adv_key(self) -> tuple[int, int]:
+        """BLE type and raw length of the advs this codec can decode: decode_adv rejects any other adv."""
+        return (self._ble_type, self._header_start_pos + len(self._header) + self._len + len(self._footer))
 
     def decode_adv(self, adv: BleAdvAdvertisement) -> tuple[BleAdvEncCmd | None, BleAdvConfig | None]:
         """Decode Adv into Encoder Attributes / Config."""
@@ -533,8 +563,8 @@ class BleAdvCodec(ABC):
         if (
             not self.is_eq(self._ble_type, adv.ble_type, "BLE Type")
             or not self.is_eq(self._len, last_pos - len(self._header) - self._header_start_pos, "Length")
-            or not self.is_eq_buf(self._header, adv.raw[self._header_start_pos :], "Header")
-            or not self.is_eq_buf(self._footer, adv.raw[last_pos:], "footer")
+            or not self.is_eq_buf(self._header, adv.raw, "Header", self._header_start_pos)
+            or not self.is_eq_buf(self._footer, adv.raw, "footer", last_pos)
         ):
             return None, None
         self.log_buffer(adv.raw, "Decode/Full")
@@ -569,14 +599,14 @@ class BleAdvCodec(ABC):
             return False
         return True
 
-    def is_eq_buf(self, ref_buf: bytes, comp_buf: bytes, msg: str) -> bool:
-        """Check buffer equal and log if not."""
-        trunc_comp_buf = comp_buf[: len(ref_buf)]
-        if trunc_comp_buf != ref_buf:
-            if self.debug_mode:
-                _LOGGER.debug(f"[{self.codec_id}] '{msg}' differs - expected: {as_hex(ref_buf)}, received: {as_hex(trunc_comp_buf)}")
-            return False
-        return True
+    def is_eq_buf(self, ref_buf: bytes, comp_buf: bytes, msg: str, start: int = 0) -> bool:
+        """Check buffer equal to the start of comp_buf from position start and log if not."""
+        if comp_buf.startswith(ref_buf, start):
+            return True
+        if self.debug_mode:
+            trunc_comp_buf = comp_buf[start : start + len(ref_buf)]
+            _LOGGER.debug(f"[{self.codec_id}] '{msg}' differs - expected: {as_hex(ref_buf)}, received: {as_hex(trunc_comp_buf)}")
+        return False
 
     def log_buffer(self, buf: bytes, msg: str) -> None:
         """Log buffer."""
@@ -1,5 +1,7 @@
 """No Name physical remotes."""
 
+import struct
+
 from .const import (
     ATTR_CMD,
     ATTR_CMD_BR_DOWN,
@@ -22,6 +24,9 @@ from .models import (
 )
 from .models import EncoderMatcher as EncCmd
 
+# Remote decoded frames: arg0, id, cmd | arg1, tx_count
+_FRAME = struct.Struct("<BIBB")
+
 
 class RemoteEncoder(BleAdvCodec):
     """Phisical Remote encoder."""
@@ -43,20 +48,20 @@ class RemoteEncoder(BleAdvCodec):
 
     def convert_to_enc(self, decoded: bytes) -> tuple[BleAdvEncCmd | None, BleAdvConfig | None]:
         """Convert a readable buffer into an encoder command and a config."""
+        arg0, uid, cmd_arg1, tx_count = _FRAME.unpack_from(decoded)
         conf = BleAdvConfig()
-        conf.tx_count = decoded[6]
-        conf.id = int.from_bytes(decoded[1:5], "little")
+        conf.tx_count = tx_count
+        conf.id = uid
 
-        enc_cmd = BleAdvEncCmd(decoded[5] & 0x3F)
-        enc_cmd.arg0 = decoded[0]
-        enc_cmd.arg1 = decoded[5] & 0xC0
+        enc_cmd = BleAdvEncCmd(cmd_arg1 & 0x3F)
+        enc_cmd.arg0 = arg0
+        enc_cmd.arg1 = cmd_arg1 & 0xC0
 
         return enc_cmd, conf
 
     def convert_from_enc(self, enc_cmd: BleAdvEncCmd, conf: BleAdvConfig) -> bytes:
         """Convert an encoder command and a config into a readable buffer."""
-        uid = conf.id.to_bytes(4, "little")
-        return bytes([enc_cmd.arg0, *uid, enc_cmd.cmd | enc_cmd.arg1, conf.tx_count])
+        return _FRAME.pack(enc_cmd.arg0, conf.id, enc_cmd.cmd | enc_cmd.arg1, conf.tx_count)
 
 
 TRANS = [
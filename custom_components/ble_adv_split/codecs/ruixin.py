@@ -1,5 +1,7 @@
 """RuiXin App."""
 
+import struct
+from functools import lru_cache
 from typing import ClassVar
 
 from .const import (
@@ -29,6 +31,16 @@ from .models import (
     Trans,
 )
 from .models import EncoderMatcher as EncCmd
+from .utils import add_bytes
+
+# RuiXin decoded frames: seed, tx_count, id, cmd, arg0, arg1, arg2
+_FRAME = struct.Struct("<BBIBBBB")
+
+
+@lru_cache(maxsize=512)
+def _key(seed: int, sign: int) -> int:
+    """Compute the bytes to be added to the 14 encrypted bytes: sign * (seed + index), as a big integer."""
+    return int.from_bytes(bytes([(sign * (seed + i)) & 0xFF for i in range(14)]))
 
 
 class RuiXinEncoder(BleAdvCodec):
@@ -43,7 +55,7 @@ class RuiXinEncoder(BleAdvCodec):
 
     def decrypt(self, buffer: bytes) -> bytes | None:
         """Decrypt / unwhiten an incoming raw buffer into a readable buffer."""
-        buffer = buffer[:2] + bytes([((x - buffer[0] - i) + 256) % 256 for i, x in enumerate(buffer[2:16])])
+        buffer = buffer[:2] + add_bytes(buffer[2:16], _key(buffer[0], -1))
         if not self.is_eq(self._checksum(buffer[2:15]), buffer[15], "Checksum"):
             return None
         return buffer[:10]
@@ -52,26 +64,26 @@ class RuiXinEncoder(BleAdvCodec):
         """Encrypt / whiten a readable buffer."""
         buffer = bytearray(buffer + self.PADDING)
         buffer[15] = self._checksum(buffer[2:15])
-        return buffer[:2] + bytes([((x + buffer[0] + i) + 256) % 256 for i, x in enumerate(buffer[2:16])]) + buffer[16:]
+        return buffer[:2] + add_bytes(buffer[2:16], _key(buffer[0], 1)) + buffer[16:]
 
     def convert_to_enc(self, decoded: bytes) -> tuple[BleAdvEncCmd | None, BleAdvConfig | None]:
         """Convert a readable buffer into an encoder command and a config."""
+        seed, tx_count, uid, cmd, arg0, arg1, arg2 = _FRAME.unpack_from(decoded)
         conf = BleAdvConfig()
-        conf.seed = decoded[0]
-        conf.tx_count = decoded[1]
-        conf.id = int.from_bytes(decoded[2:6], "little")
+        conf.seed = seed
+        conf.tx_count = tx_count
+        conf.id = uid
 
-        enc_cmd = BleAdvEncCmd(decoded[6])
-        enc_cmd.arg0 = decoded[7]
-        enc_cmd.arg1 = decoded[8]
-        enc_cmd.arg2 = decoded[9]
+        enc_cmd = BleAdvEncCmd(cmd)
+        enc_cmd.arg0 = arg0
+        enc_cmd.arg1 = arg1
+        enc_cmd.arg2 = arg2
 
         return enc_cmd, conf
 
     def convert_from_enc(self, enc_cmd: BleAdvEncCmd, conf: BleAdvConfig) -> bytes:
         """Convert an encoder command and a config into a readable buffer."""
-        uid = conf.id.to_bytes(4, "little")
-        return bytes([conf.seed, conf.tx_count, *uid, enc_cmd.cmd, enc_cmd.arg0, enc_cmd.arg1, enc_cmd.arg2])
+        return _FRAME.pack(conf.seed, conf.tx_count, conf.id, enc_cmd.cmd, enc_cmd.arg0, enc_cmd.arg1, enc_cmd.arg2)
 
 
 class RuiXinRemoteEncoder(RuiXinEncoder):
@@ -1,5 +1,6 @@
 """RW.Light."""
 
+import struct
 from binascii import crc_hqx
 from typing import Self
 
@@ -35,12 +36,18 @@ from .models import (
 from .models import EncoderMatcher as EncCmd
 from .utils import reverse_all, whiten
 
+# RW decoded frames: cmd, tx_count, id, index, arg0, arg1, arg2, seed
+_FRAME = struct.Struct("<BBIBBBBB")
+
 
 class RwEncoder(BleAdvCodec):
     """RW encoder."""
 
     _len = 18
     _seed_max = 0xF5
+    # whitening seed is constant: the whitening stream for the full buffer is computed once, in both bit orders
+    _whitening = int.from_bytes(whiten(bytes(_len), 0x69))
+    _whitening_rev = int.from_bytes(reverse_all(whiten(bytes(_len), 0x69)))
 
     def _crc16(self, buffer: bytes) -> int:
         """CRC16 CCITT computing."""
@@ -53,47 +60,66 @@ class RwEncoder(BleAdvCodec):
 
     def decrypt(self, buffer: bytes) -> bytes | None:
         """Decrypt / unwhiten an incoming raw buffer into a readable buffer."""
-        decoded = reverse_all(whiten(buffer, 0x69))
-        if (
-            not self.is_eq(0x4C, decoded[8], "8 is 0x4C")
-            or not self.is_eq(0xFF, decoded[9], "9 is 0xFF")
-            or not self.is_eq(0x00, decoded[10], "10 is 0x00")
-            or not self.is_eq(0x01, decoded[12], "12 is 0x01")
-            or not self.is_eq(0x02, decoded[14], "14 is 0x02")
-            or not self.is_eq(int.from_bytes(decoded[-2:]), self._crc16(decoded[:-2]), "CRC")
+        # bit reversal distributes over XOR: reverse(buffer ^ whitening) == reverse(buffer) ^ reverse(whitening)
+        decoded = (int.from_bytes(reverse_all(buffer)) ^ self._whitening_rev).to_bytes(self._len)
+        if not (
+            decoded[8:11] == b"\x4c\xff\x00"
+            and decoded[12] == 0x01
+            and decoded[14] == 0x02
+            and int.from_bytes(decoded[-2:]) == self._crc16(decoded[:-2])
         ):
+            # most scanned adverts are rejected here: the detailed checks only run to log the failing one
+            self._log_rejected(decoded)
             return None
 
         pivot = decoded[11] ^ decoded[13] ^ decoded[15]
+        p1 = pivot ^ decoded[1]
+        p2 = pivot ^ decoded[2]
+        p5 = pivot ^ decoded[5]
         return bytes(
             [
                 decoded[0] ^ pivot,
-                decoded[1] ^ pivot,
-                decoded[2] ^ pivot ^ decoded[1],
-                decoded[3] ^ pivot ^ decoded[1],
-                decoded[4] ^ pivot ^ decoded[1],
-                decoded[5] ^ pivot ^ decoded[2],
-                decoded[6] ^ pivot ^ decoded[2],
-                decoded[7] ^ pivot ^ decoded[2],
-                decoded[11] ^ pivot ^ decoded[5],
-                decoded[13] ^ pivot ^ decoded[5],
+                p1,
+                decoded[2] ^ p1,
+                decoded[3] ^ p1,
+                decoded[4] ^ p1,
+                decoded[5] ^ p2,
+                decoded[6] ^ p2,
+                decoded[7] ^ p2,
+                decoded[11] ^ p5,
+                decoded[13] ^ p5,
                 pivot,
             ]
         )
 
+    def _log_rejected(self, decoded: bytes) -> None:
+        """Log the first failing check of a rejected decoded buffer."""
+        if self.debug_mode:
+            (
+                self.is_eq(0x4C, decoded[8], "8 is 0x4C")
+                and self.is_eq(0xFF, decoded[9], "9 is 0xFF")
+                and self.is_eq(0x00, decoded[10], "10 is 0x00")
+                and self.is_eq(0x01, decoded[12], "12 is 0x01")
+                and self.is_eq(0x02, decoded[14], "14 is 0x02")
+                and self.is_eq(int.from_bytes(decoded[-2:]), self._crc16(decoded[:-2]), "CRC")
+            )
+
     def encrypt(self, buffer: bytes) -> bytes:
         """Encrypt / whiten a readable buffer."""
-        b12 = buffer[1] ^ buffer[2]
+        b1 = buffer[1]
+        b10 = buffer[10]
+        b12 = b1 ^ buffer[2]
+        b1210 = b12 ^ b10
         encoded = bytes(
             [
-                buffer[0] ^ buffer[10],
-                buffer[1] ^ buffer[10],
-                buffer[2] ^ buffer[1],
-                buffer[3] ^ buffer[1],
-                buffer[4] ^ buffer[1],
-                buffer[5] ^ b12 ^ buffer[10],
-                buffer[6] ^ b12 ^ buffer[10],
-                buffer[7] ^ b12 ^ buffer[10],
+                buffer[0] ^ b10,
+                b1 ^ b10,
+                buffer[2] ^ b1,
+                buffer[3] ^ b1,
+                buffer[4] ^ b1,
+                buffer[5] ^ b1210,
+                buffer[6] ^ b1210,
+                buffer[7] ^ b1210,
                 0x4C,
                 0xFF,
                 0x00,
@@ -101,31 +127,31 @@ class RwEncoder(BleAdvCodec):
                 0x01,
                 buffer[9] ^ b12,
                 0x02,
-                buffer[8] ^ buffer[9] ^ buffer[10],
+                buffer[8] ^ buffer[9] ^ b10,
             ]
         )
         encoded += self._crc16(encoded).to_bytes(2)
-        return whiten(reverse_all(encoded), 0x69)
+        return (int.from_bytes(reverse_all(encoded)) ^ self._whitening).to_bytes(self._len)
 
     def convert_to_enc(self, decoded: bytes) -> tuple[BleAdvEncCmd | None, BleAdvConfig | None]:
         """Convert a readable buffer into an encoder command and a config."""
+        cmd, tx_count, uid, index, arg0, arg1, arg2, seed = _FRAME.unpack_from(decoded)
         conf = BleAdvConfig()
-        conf.id = int.from_bytes(decoded[2:6], "little")
-        conf.index = decoded[6]
-        conf.tx_count = decoded[1]
-        conf.seed = decoded[10]
+        conf.id = uid
+        conf.index = index
+        conf.tx_count = tx_count
+        conf.seed = seed
 
-        enc_cmd = BleAdvEncCmd(decoded[0])
-        enc_cmd.arg0 = decoded[7]
-        enc_cmd.arg1 = decoded[8]
-        enc_cmd.arg2 = decoded[9]
+        enc_cmd = BleAdvEncCmd(cmd)
+        enc_cmd.arg0 = arg0
+        enc_cmd.arg1 = arg1
+        enc_cmd.arg2 = arg2
 
         return enc_cmd, conf
 
     def convert_from_enc(self, enc_cmd: BleAdvEncCmd, conf: BleAdvConfig) -> bytes:
         """Convert an encoder command and a config into a readable buffer."""
-        uid = conf.id.to_bytes(4, "little")
-        return bytes([enc_cmd.cmd, conf.tx_count, *uid, conf.index, enc_cmd.arg0, enc_cmd.arg1, enc_cmd.arg2, conf.seed])
+        return _FRAME.pack(enc_cmd.cmd, conf.tx_count, conf.id, conf.index, enc_cmd.arg0, enc_cmd.arg1, enc_cmd.arg2, conf.seed)
 
 
 class TransRGB(Trans):
@@ -1,11 +1,15 @@
 """Utils for codecs."""
 
+from binascii import crc_hqx
+from functools import cache, lru_cache
 
-def whiten(buffer: bytes, seed: int) -> bytes:
-    """Whiten / Unwiten buffer with seed."""
-    obuf = []
+
+@lru_cache(maxsize=256)
+def _whitening(seed: int, buf_len: int) -> int:
+    """Compute the whitening stream of a seed, as a big integer of buf_len bytes."""
+    obuf = bytearray(buf_len)
     r = seed
-    for val in buffer:
+    for i in range(buf_len):
         b = 0
         for j in range(8):
             r <<= 1
@@ -13,30 +17,74 @@ def whiten(buffer: bytes, seed: int) -> bytes:
                 r ^= 0x11
                 b |= 1 << j
             r &= 0x7F
-        obuf.append(val ^ b)
-    return bytes(obuf)
+        obuf[i] = b
+    return int.from_bytes(obuf)
 
 
-def reverse_byte(x: int) -> int:
-    """Reverse a single byte: 1100 1010 => 0101 0011."""
+def whiten(buffer: bytes, seed: int) -> bytes:
+    """Whiten / Unwiten buffer with seed."""
+    buf_len = len(buffer)
+    return (int.from_bytes(buffer) ^ _whitening(seed, buf_len)).to_bytes(buf_len)
+
+
+def _reverse_bits(x: int) -> int:
     x = ((x & 0x55) << 1) | ((x & 0xAA) >> 1)
     x = ((x & 0x33) << 2) | ((x & 0xCC) >> 2)
     return ((x & 0x0F) << 4) | ((x & 0xF0) >> 4)
 
 
+# bit reversal of each byte as a bytes.translate table
+_REVERSE_TABLE = bytes(_reverse_bits(x) for x in range(256))
+
+
+def reverse_byte(x: int) -> int:
+    """Reverse a single byte: 1100 1010 => 0101 0011."""
+    return _REVERSE_TABLE[x]
+
+
 def reverse_all(buffer: bytes) -> bytes:
     """Reverse All bytes in buffer."""
-    return bytes([reverse_byte(x) for x in buffer])
+    return bytes(buffer).translate(_REVERSE_TABLE)
+
+
+@cache
+def _crc16_le_table(poly: int) -> tuple[int, ...]:
+    """Compute the byte at a time table of a reflected CRC16 polynomial."""
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = (crc >> 1) ^ poly if crc & 0x0001 else crc >> 1
+        table.append(crc)
+    return tuple(table)
+
+
+def _reverse16(x: int) -> int:
+    return (_REVERSE_TABLE[x & 0xFF] << 8) | _REVERSE_TABLE[x >> 8]
 
 
 def crc16_le(buffer: bytes, seed: int, poly: int = 0x8408, ref_in: bool = True, ref_out: bool = True) -> int:
     """CRC16 ISO14443AB computing."""
     crc = seed if not ref_in else seed ^ 0xFFFF
-    for byte in buffer:
-        crc = crc ^ byte
-        for _ in range(8):
-            if crc & 0x0001:
-                crc = (crc >> 1) ^ poly
-            else:
-                crc = crc >> 1
+    if poly == 0x8408:
+        # reflected CCITT polynomial: binascii CCITT CRC on the bit reversed input and crc
+        crc = _reverse16(crc_hqx(reverse_all(buffer), _reverse16(crc)))
+    else:
+        table = _crc16_le_table(poly)
+        for byte in buffer:
+            crc = (crc >> 8) ^ table[(crc ^ byte) & 0xFF]
     return crc if not ref_out else crc ^ 0xFFFF
+
+
+@cache
+def _swar_masks(buf_len: int) -> tuple[int, int]:
+    """SWAR masks to add bytes packed in big integers of buf_len bytes, without carry from one byte to the next."""
+    return int.from_bytes(bytes([0x7F] * buf_len)), int.from_bytes(bytes([0x80] * buf_len))
+
+
+def add_bytes(buffer: bytes, key: int) -> bytes:
+    """Add the key, a big integer of len(buffer) bytes, to the buffer, each byte modulo 256."""
+    buf_len = len(buffer)
+    low7, high1 = _swar_masks(buf_len)
+    val = int.from_bytes(buffer)
+    return (((val & low7) + (key & low7)) ^ ((val ^ key) & high1)).to_bytes(buf_len)
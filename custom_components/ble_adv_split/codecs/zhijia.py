@@ -46,6 +46,11 @@ class ZhijiaEncoder(BleAdvCodec):
 
     _pivot_index: frozenset[int] = frozenset()
     _pivot_xor = False
+    _whitening: int = 0  # whitening stream(s) of the full buffer, combined as a big integer
+
+    def _whiten(self, buffer: bytes) -> bytes:
+        """Whiten / Unwhiten a buffer of _len bytes with the precomputed whitening stream."""
+        return (int.from_bytes(buffer) ^ self._whitening).to_bytes(self._len)
 
     def _crc16(self, buffer: bytes, seed: int) -> int:
         """CRC16 ISO14443AB computing."""
@@ -64,10 +69,11 @@ class ZhijiaEncoderV0(ZhijiaEncoder):
 
     _pivot_index: frozenset[int] = frozenset({0, 1, 6, 7})
     _len = 13
+    _whitening = int.from_bytes(whiten(whiten(bytes(_len), 0x37), 0x7F))
 
     def decrypt(self, buffer: bytes) -> bytes | None:
         """Decrypt / unwhiten an incoming raw buffer into a readable buffer."""
-        decoded_base = whiten(whiten(buffer, 0x37), 0x7F)
+        decoded_base = self._whiten(buffer)
         if not self.is_eq(int.from_bytes(decoded_base[-2:], "little"), self._crc16(decoded_base[:-2], 0), "CRC"):
             return None
         return decoded_base[:-2]
@@ -76,7 +82,7 @@ class ZhijiaEncoderV0(ZhijiaEncoder):
         """Encrypt / whiten a readable buffer."""
         decoded_base = bytearray(buffer)
         decoded_base += self._crc16(decoded_base, 0).to_bytes(2, "little")
-        return whiten(whiten(decoded_base, 0x7F), 0x37)
+        return self._whiten(decoded_base)
 
     def convert_to_enc(self, decoded: bytes) -> tuple[BleAdvEncCmd | None, BleAdvConfig | None]:
         """Convert a readable buffer into an encoder command and a config."""
@@ -116,6 +122,7 @@ class ZhijiaEncoderV1(ZhijiaEncoder):
     _len = 23
     _tx_step = 2
     _pivot_xor = True
+    _whitening = int.from_bytes(whiten(bytes(_len), 0x37))
 
     def __init__(self, mac: list[int]) -> None:
         super().__init__()
@@ -123,7 +130,7 @@ class ZhijiaEncoderV1(ZhijiaEncoder):
 
     def decrypt(self, buffer: bytes) -> bytes | None:
         """Decrypt / unwhiten an incoming raw buffer into a readable buffer."""
-        decoded_base = whiten(buffer, 0x37)
+        decoded_base = self._whiten(buffer)
         if not self.is_eq(int.from_bytes(decoded_base[-2:], "little"), self._crc16(decoded_base[:-2], 0), "CRC"):
             return None
         return decoded_base[:-2]
@@ -132,7 +139,7 @@ class ZhijiaEncoderV1(ZhijiaEncoder):
         """Encrypt / whiten a readable buffer."""
         decoded_base = bytearray(buffer)
         decoded_base += self._crc16(decoded_base, 0).to_bytes(2, "little")
-        return whiten(decoded_base, 0x37)
+        return self._whiten(decoded_base)
 
     def common_convert_to_enc(self, decoded: bytes) -> tuple[BleAdvEncCmd | None, BleAdvConfig | None]:
         """Convert common part to encoder command and config."""
@@ -206,19 +213,19 @@ class ZhijiaEncoderV2(ZhijiaEncoderV1):
     _pivot_index: frozenset[int] = frozenset({3, 7, 11, 12, 13, 15})
     _len = 24
     _pivot_xor = True
+    # whitened with 0x6F, but the last 2 bytes are not whitened with 0xD3
+    _whitening = int.from_bytes(whiten(whiten(bytes(_len - 2), 0xD3) + bytes(2), 0x6F))
 
     def decrypt(self, buffer: bytes) -> bytes | None:
         """Decrypt / unwhiten an incoming raw buffer into a readable buffer."""
-        buf1 = whiten(buffer, 0x6F)
-        buf2 = whiten(buf1[:-2], 0xD3) + buf1[-2:]
+        buf2 = self._whiten(buffer)
         if not self.is_eq_buf(bytes([0x00] * 7), buf2[-7:], "Zero padding"):
             return None
         return buf2[:-7]
 
     def encrypt(self, buffer: bytes) -> bytes:
         """Encrypt / whiten a readable buffer."""
-        buf1 = buffer + bytes([0x00] * 7)
-        return whiten(whiten(buf1[:-2], 0xD3) + buf1[-2:], 0x6F)
+        return self._whiten(buffer + bytes(7))
 
     def convert_to_enc(self, decoded: bytes) -> tuple[BleAdvEncCmd | None, BleAdvConfig | None]:
         """Convert a readable buffer into an encoder command and a config."""
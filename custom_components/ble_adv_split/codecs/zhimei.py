@@ -1,7 +1,9 @@
 """Zhi Mei Encoders."""
 
+import struct
 from binascii import crc_hqx
-from typing import ClassVar
+from functools import lru_cache
+from typing import ClassVar, Self
 
 from .const import (
     ATTR_BLUE_F,
@@ -43,16 +45,56 @@ from .models import (
     Trans,
 )
 from .models import EncoderMatcher as EncCmd
-from .utils import reverse_all, reverse_byte, whiten
+from .utils import add_bytes, crc16_le, whiten
+
+# Zhi Mei V0 decoded frames: index, tx_count, id, cmd, arg0, arg1, arg2
+_V0_FRAME = struct.Struct("<BBHBBBB")
+# Zhi Mei V1 decoded frames: 0xFF, seed, tx_count, id, cmd, index, 0xFF, tx_count, arg0, arg1, arg2
+_V1_FRAME = struct.Struct("<BBBIBBBBBBB")
+# Zhi Mei V2 decoded frames, once unxored: id high byte, arg0, index, arg1, cmd, id low byte, tx_count ^ id high byte, arg0 ^ arg2
+_V2_FRAME = struct.Struct("<8B")
+
+_MATRIX = bytes([29, 4, 17, 32, 152, 117, 40, 70, 11, 175, 67, 172, 214, 190, 137, 142])
+# matrix pivot indexed by the byte it is computed from: MATRIX[high nibble ^ low nibble]
+_PIVOTS = bytes(_MATRIX[(x >> 4) ^ (x & 0xF)] for x in range(256))
+
+
+@lru_cache(maxsize=64)
+def _matrix_key(key: int, buf_len: int, sign: int) -> int:
+    """Compute the bytes to be added to a buffer: sign * MATRIX[key + index], as a big integer of buf_len bytes."""
+    return int.from_bytes(bytes([(sign * _MATRIX[(key + i) & 0xF]) & 0xFF for i in range(buf_len)]))
+
+
+@lru_cache(maxsize=256)
+def _crc16_v2(buffer: bytes) -> int:
+    """Zhi Mei V2 CRC: reflected CCITT CRC, cached as retransmitted frames share the same content."""
+    return crc16_le(buffer, 0)
+
+
+@lru_cache(maxsize=256)
+def _xor_table(pivot: int) -> bytes:
+    """Compute the bytes.translate table xoring each byte with pivot."""
+    return bytes([x ^ pivot for x in range(256)])
+
+
+def _xor_pivot(buffer: bytes, pivot: int) -> bytes:
+    """Xor each byte of the buffer with pivot."""
+    return bytes(buffer).translate(_xor_table(pivot))
 
 
 class ZhimeiEncoderV0(BleAdvCodec):
     """Zhi Mei V0 encoder."""
 
     _len = 9
+    _header_sum: int = 0
+
+    def header(self, header: list[int], start_pos: int = 0) -> Self:
+        """Set header, its sum is part of the checksum."""
+        self._header_sum = sum(header)
+        return super().header(header, start_pos)
 
     def _checksum(self, buffer: bytes) -> int:
-        return (sum(buffer) + sum(self._header)) & 0xFF
+        return (sum(buffer) + self._header_sum) & 0xFF
 
     def decrypt(self, buffer: bytes) -> bytes | None:
         """Decrypt / unwhiten an incoming raw buffer into a readable buffer."""
@@ -66,22 +108,22 @@ class ZhimeiEncoderV0(BleAdvCodec):
 
     def convert_to_enc(self, decoded: bytes) -> tuple[BleAdvEncCmd | None, BleAdvConfig | None]:
         """Convert a readable buffer into an encoder command and a config."""
+        index, tx_count, uid, cmd, arg0, arg1, arg2 = _V0_FRAME.unpack_from(decoded)
         conf = BleAdvConfig()
-        conf.index = decoded[0]
-        conf.tx_count = decoded[1]
-        conf.id = int.from_bytes(decoded[2:4], "little")
+        conf.index = index
+        conf.tx_count = tx_count
+        conf.id = uid
 
-        enc_cmd = BleAdvEncCmd(decoded[4])
-        enc_cmd.arg0 = decoded[5]
-        enc_cmd.arg1 = decoded[6]
-        enc_cmd.arg2 = decoded[7]
+        enc_cmd = BleAdvEncCmd(cmd)
+        enc_cmd.arg0 = arg0
+        enc_cmd.arg1 = arg1
+        enc_cmd.arg2 = arg2
 
         return enc_cmd, conf
 
     def convert_from_enc(self, enc_cmd: BleAdvEncCmd, conf: BleAdvConfig) -> bytes:
         """Convert an encoder command and a config into a readable buffer."""
-        uid = conf.id.to_bytes(2, "little")
-        return bytes([conf.index, conf.tx_count, *uid, enc_cmd.cmd, enc_cmd.arg0, enc_cmd.arg1, enc_cmd.arg2])
+        return _V0_FRAME.pack(conf.index, conf.tx_count, conf.id, enc_cmd.cmd, enc_cmd.arg0, enc_cmd.arg1, enc_cmd.arg2)
 
 
 class ZhimeiEncoderV1(BleAdvCodec):
@@ -90,7 +132,7 @@ class ZhimeiEncoderV1(BleAdvCodec):
     _len = 16
     _seed_max = 0xF5
 
-    MATRIX: ClassVar[list[int]] = [29, 4, 17, 32, 152, 117, 40, 70, 11, 175, 67, 172, 214, 190, 137, 142]
+    MATRIX: ClassVar[bytes] = _MATRIX
 
     def __init__(self) -> None:
         super().__init__()
@@ -101,13 +143,12 @@ class ZhimeiEncoderV1(BleAdvCodec):
 
     def _apply_matrix(self, buffer: bytes, key: int) -> bytes:
         """Apply xor pivot with Encoding Matrix."""
-        pivot = self.MATRIX[((buffer[1] >> 4) & 15) ^ (buffer[1] & 15)]
-        return bytes([(((x ^ pivot) + self.MATRIX[(key + i) & 0xF]) + 256) % 256 for i, x in enumerate(buffer)])
+        return add_bytes(_xor_pivot(buffer, _PIVOTS[buffer[1]]), _matrix_key(key, len(buffer), 1))
 
     def _unapply_matrix(self, buffer: bytes, key: int) -> bytes:
         """Unapply xor pivot with Encoding Matrix."""
         pivot = ((buffer[0] - self.MATRIX[key & 0xF]) & 0xFF) ^ 0xFF
-        return bytes([((x - self.MATRIX[(key + i) & 0xF] + 256) % 256) ^ pivot for i, x in enumerate(buffer)])
+        return _xor_pivot(add_bytes(buffer, _matrix_key(key, len(buffer), -1)), pivot)
 
     def decrypt(self, buffer: bytes) -> bytes | None:
         """Decrypt / unwhiten an incoming raw buffer into a readable buffer."""
@@ -121,7 +162,7 @@ class ZhimeiEncoderV1(BleAdvCodec):
             not self.is_eq(decoded[2], decoded[10], "Dupe 2/10")
             or not self.is_eq(0xFF, decoded[0], "0 not FF")
             or not self.is_eq(0xFF, decoded[9], "9 not FF")
-            or not self.is_eq_buf(buffer[: self._header_start_pos], decoded[2 : 2 + self._header_start_pos], "Dupe Pre header")
+            or not self.is_eq_buf(buffer[: self._header_start_pos], decoded, "Dupe Pre header", 2)
         ):
             return None
         return decoded
@@ -136,23 +177,26 @@ class ZhimeiEncoderV1(BleAdvCodec):
 
     def convert_to_enc(self, decoded: bytes) -> tuple[BleAdvEncCmd | None, BleAdvConfig | None]:
         """Convert a readable buffer into an encoder command and a config."""
+        _, seed, tx_count, uid, cmd, index, _, _, arg0, arg1, arg2 = _V1_FRAME.unpack_from(decoded)
         conf = BleAdvConfig()
-        conf.index = decoded[8]
-        conf.tx_count = decoded[2]
-        conf.seed = decoded[1]
-        conf.id = int.from_bytes(decoded[3:7], "little")
+        conf.index = index
+        conf.tx_count = tx_count
+        conf.seed = seed
+        conf.id = uid
 
-        enc_cmd = BleAdvEncCmd(decoded[7])
-        enc_cmd.arg0 = decoded[11]
-        enc_cmd.arg1 = decoded[12]
-        enc_cmd.arg2 = decoded[13]
+        enc_cmd = BleAdvEncCmd(cmd)
+        enc_cmd.arg0 = arg0
+        enc_cmd.arg1 = arg1
+        enc_cmd.arg2 = arg2
 
         return enc_cmd, conf
 
     def convert_from_enc(self, enc_cmd: BleAdvEncCmd, conf: BleAdvConfig) -> bytes:
         """Convert an encoder command and a config into a readable buffer."""
-        uid = (conf.id & 0xFFFF).to_bytes(4, "little")
-        return bytes([0xFF, conf.seed, conf.tx_count, *uid, enc_cmd.cmd, conf.index, 0xFF, conf.tx_count, enc_cmd.arg0, enc_cmd.arg1, enc_cmd.arg2])
+        uid = conf.id & 0xFFFF
+        return _V1_FRAME.pack(
+            0xFF, conf.seed, conf.tx_count, uid, enc_cmd.cmd, conf.index, 0xFF, conf.tx_count, enc_cmd.arg0, enc_cmd.arg1, enc_cmd.arg2
+        )
 
 
 class ZhimeiEncoderV2(BleAdvCodec):
@@ -165,8 +209,7 @@ class ZhimeiEncoderV2(BleAdvCodec):
         self.footer([0x10, 0x11, 0x12, 0x13, 0x14, 0x15, 0x16, 0x17, 0x18, 0x19])
 
     def _crc16(self, buffer: bytes) -> int:
-        pre_cec: int = crc_hqx(reverse_all(buffer), 0xFFFF)
-        return 0xFFFF ^ (((reverse_byte(pre_cec & 0xFF) << 8) & 0xFF00) | (reverse_byte(pre_cec >> 8) & 0xFF))
+        return _crc16_v2(bytes(buffer))
 
     def decrypt(self, buffer: bytes) -> bytes | None:
         """Decrypt / unwhiten an incoming raw buffer into a readable buffer."""
@@ -183,37 +226,28 @@ class ZhimeiEncoderV2(BleAdvCodec):
     def convert_to_enc(self, decoded: bytes) -> tuple[BleAdvEncCmd | None, BleAdvConfig | None]:
         """Convert a readable buffer into an encoder command and a config."""
         pivot = decoded[0] ^ decoded[1] ^ decoded[6] ^ decoded[7]
-        decoded = bytes([x ^ pivot for x in decoded])
+        uid_high, arg0, index, arg1, cmd, uid_low, tx_uid, arg02 = _V2_FRAME.unpack_from(_xor_pivot(decoded, pivot))
 
         conf = BleAdvConfig()
-        conf.index = decoded[2]
-        conf.tx_count = decoded[6] ^ decoded[0]
-        conf.id = int.from_bytes([decoded[5], decoded[0]], "little")
+        conf.index = index
+        conf.tx_count = tx_uid ^ uid_high
+        conf.id = (uid_high << 8) | uid_low
 
-        enc_cmd = BleAdvEncCmd(decoded[4])
-        enc_cmd.arg0 = decoded[1]
-        enc_cmd.arg1 = decoded[3]
-        enc_cmd.arg2 = decoded[7] ^ decoded[1]
+        enc_cmd = BleAdvEncCmd(cmd)
+        enc_cmd.arg0 = arg0
+        enc_cmd.arg1 = arg1
+        enc_cmd.arg2 = arg02 ^ arg0
 
         return enc_cmd, conf
 
     def convert_from_enc(self, enc_cmd: BleAdvEncCmd, conf: BleAdvConfig) -> bytes:
         """Convert an encoder command and a config into a readable buffer."""
-        uid = (conf.id & 0xFFFF).to_bytes(2, "little")
-        decoded = bytes(
-            [
-                uid[1],
-                enc_cmd.arg0,
-                conf.index,
-                enc_cmd.arg1,
-                enc_cmd.cmd,
-                uid[0],
-                conf.tx_count ^ uid[1],
-                enc_cmd.arg0 ^ enc_cmd.arg2,
-            ]
+        uid_high, uid_low = divmod(conf.id & 0xFFFF, 0x100)
+        decoded = _V2_FRAME.pack(
+            uid_high, enc_cmd.arg0, conf.index, enc_cmd.arg1, enc_cmd.cmd, uid_low, conf.tx_count ^ uid_high, enc_cmd.arg0 ^ enc_cmd.arg2
         )
-        pivot = decoded[0] ^ decoded[1] ^ decoded[6] ^ decoded[7]
-        return bytes([x ^ pivot for x in decoded])
+        # pivot is the xor of bytes 0, 1, 6 and 7: uid_high ^ arg0 ^ (tx_count ^ uid_high) ^ (arg0 ^ arg2)
+        return _xor_pivot(decoded, conf.tx_count ^ enc_cmd.arg2)
 
 
 TRANS_COMMON = [
@@ -2,10 +2,14 @@
 
 from __future__ import annotations
 
+import asyncio
 import logging
 import sys
-from dataclasses import dataclass
+import time
+from collections.abc import Mapping
+from dataclasses import astuple, dataclass
 from datetime import datetime, timedelta
+from heapq import heappop, heappush
 from typing import Any
 
 from homeassistant.const import EVENT_HOMEASSISTANT_STOP
@@ -20,6 +24,16 @@ from .esp_adapters import BleAdvEspBtManager
 _LOGGER = logging.getLogger(__name__)
 
 
+def _now_ms() -> int:
+    """Monotonic time in milliseconds, for the expiry computations of the adv handling path."""
+    return time.monotonic_ns() // 1_000_000
+
+
+def _as_datetime(time_ms: int) -> datetime:
+    """Convert a monotonic time in milliseconds to a datetime, for diagnostics only."""
+    return datetime.now() + timedelta(milliseconds=time_ms - _now_ms())
+
+
 class BleAdvBaseDevice:
     """Base Ble Adv Device."""
 
@@ -61,11 +75,9 @@ class BleAdvBaseDevice:
         self.in_use_codec_ids.add(codec_id)
         self._listeners.append((self.coordinator.codecs[codec_id].match_id, config))
 
-    def match(self, match_id: str, adapter_id: str, config: BleAdvConfig) -> bool:
-        """Match a given adapter / config."""
-        return adapter_id in self.adapter_ids and any(
-            (match_id == x) and (config.id == y.id) and (config.index == y.index) for x, y in self._listeners
-        )
+    def match_keys(self) -> set[tuple[str, str, int, int]]:
+        """Get the (match_id, adapter_id, config id, config index) of the received advs matching this device."""
+        return {(match_id, adapter_id, config.id, config.index) for match_id, config in self._listeners for adapter_id in self.adapter_ids}
 
     async def async_on_command(self, ent_attrs: list[BleAdvEntAttr]) -> None:
         """Call on matching command received."""
@@ -74,9 +86,16 @@ class BleAdvBaseDevice:
         """Apply command."""
         self.config.seed = 0
         advs: list[BleAdvAdvertisement] = self.codec.encode_advs(enc_cmd, self.config)
-        for adapter_id in self.adapter_ids:
-            qi = BleAdvQueueItem(enc_cmd.cmd, self.repeat, self.duration, self.interval, [x.to_raw() for x in advs], self.codec.ign_duration)
-            await self.coordinator.advertise(adapter_id, self.unique_id, qi)
+        raws = [x.to_raw() for x in advs]
+        # one queue item per adapter as it is split and consumed by each adapter, enqueued concurrently
+        await asyncio.gather(
+            *(
+                self.coordinator.advertise(
+                    adapter_id, self.unique_id, BleAdvQueueItem(enc_cmd.cmd, self.repeat, self.duration, self.interval, raws, self.codec.ign_duration)
+                )
+                for adapter_id in self.adapter_ids
+            )
+        )
 
     async def advertise(self, ent_attr: BleAdvEntAttr) -> None:
         """Encode and Advertise a message."""
@@ -89,7 +108,7 @@ class BleAdvBaseDevice:
 class BleAdvRecvItem:
     """Received Adv and its related info."""
 
-    del_time: datetime
+    del_time: int
     match_id: str
     pub_devices: set[str]
     conf: BleAdvConfig
@@ -102,7 +121,7 @@ class BleAdvCoordinator:
     def __init__(
         self,
         hass: HomeAssistant,
-        codecs: dict[str, BleAdvCodec],
+        codecs: Mapping[str, BleAdvCodec],
         ign_adapters: list[str],
         ign_duration: int,
         ign_cids: list[int],
@@ -110,27 +129,36 @@ class BleAdvCoordinator:
     ) -> None:
         """Init."""
         self.hass: HomeAssistant = hass
-        self.codecs: dict[str, BleAdvCodec] = codecs
+        self.codecs: Mapping[str, BleAdvCodec] = codecs
         self.ign_cids: set[int] = set(ign_cids)
+        self._ign_cid_prefixes: frozenset[bytes] = frozenset(cid.to_bytes(2, "little") for cid in ign_cids)
         self.ign_macs: set[str] = set(ign_macs)
         self.ign_duration: int = ign_duration
         self.ign_adapters = ign_adapters
 
-        self._raw_last_advs: dict[bytes, datetime] = {}
-        self._emit_last_advs: dict[bytes, datetime] = {}
+        self._raw_last_advs: dict[bytes, int] = {}
+        self._emit_last_advs: dict[bytes, int] = {}
         self._dec_last_advs: dict[bytes, BleAdvRecvItem] = {}
+        # min heaps of (expiry, raw) pushed on each last advs (re)insertion: only the expired advs are visited to clean-up
+        self._raw_expiries: list[tuple[int, bytes]] = []
+        self._emit_expiries: list[tuple[int, bytes]] = []
+        self._dec_expiries: list[tuple[int, bytes]] = []
 
         self._devices: list[BleAdvBaseDevice] = []
-        self._in_use_codecs: set[str] = set()
+        self._device_index: dict[tuple[str, str, int, int], list[BleAdvBaseDevice]] = {}  # devices indexed by their match keys
+        self._in_use_codecs: dict[tuple[int, int], list[str]] = {}  # in use codec ids indexed by their adv key
 
         self._hci_bt_manager: BleAdvBtHciManager = BleAdvBtHciManager(self.handle_raw_adv, self.on_adapter_change, ign_adapters)
         self._esp_bt_manager: BleAdvEspBtManager = BleAdvEspBtManager(
             self.hass, self.handle_raw_adv, self.on_adapter_change, ign_duration, ign_cids, ign_macs
         )
 
-        self._stop_listening_time: datetime | None = None
+        self._stop_listening_time: int | None = None
         self.listened_raw_advs: list[bytes] = []
         self.listened_decoded_confs: list[tuple[str, str, str, BleAdvConfig]] = []
+        # membership sets of the listened lists above, the lists being kept for their order
+        self._listened_raw_set: set[bytes] = set()
+        self._listened_decoded_set: set[tuple[Any, ...]] = set()
 
     async def async_init(self) -> None:
         """Async Init."""
@@ -170,39 +198,55 @@ class BleAdvCoordinator:
 
     def is_listening(self) -> bool:
         """Return if listening."""
-        if self._stop_listening_time is not None and datetime.now() > self._stop_listening_time:
+        if self._stop_listening_time is not None and _now_ms() > self._stop_listening_time:
             self._stop_listening_time = None
         return self._stop_listening_time is not None
 
     def start_listening(self, max_duration: float) -> None:
         """Start listening to raw and decoded ADVs."""
-        self._stop_listening_time = datetime.now() + timedelta(seconds=max_duration)
+        self._stop_listening_time = _now_ms() + int(1000 * max_duration)
         self.listened_raw_advs.clear()
         self.listened_decoded_confs.clear()
+        self._listened_raw_set.clear()
+        self._listened_decoded_set.clear()
 
     def _recompute_in_use_codecs(self) -> None:
         match_ids = {self.codecs[codec_id].match_id for x in self._devices for codec_id in x.in_use_codec_ids}
-        self._in_use_codecs = {x.codec_id for x in self.codecs.values() if x.match_id in match_ids}
+        self._in_use_codecs = {}
+        for x in self.codecs.values():
+            if x.match_id in match_ids:
+                self._in_use_codecs.setdefault(x.adv_key, []).append(x.codec_id)
+
+    def _recompute_device_index(self) -> None:
+        self._device_index = {}
+        for device in self._devices:
+            for key in device.match_keys():
+                self._device_index.setdefault(key, []).append(device)
 
     def add_device(self, device: BleAdvBaseDevice) -> None:
         """Register a device."""
         self._devices.append(device)
         self._recompute_in_use_codecs()
+        self._recompute_device_index()
         self._raw_last_advs.clear()
+        self._raw_expiries.clear()
         _LOGGER.debug(f"Registered device '{device.unique_id}'")
 
     def remove_device(self, device: BleAdvBaseDevice) -> None:
         """Unregister a device."""
         self._devices = [x for x in self._devices if x.unique_id != device.unique_id]
         self._recompute_in_use_codecs()
+        self._recompute_device_index()
         self._dec_last_advs.clear()
+        self._dec_expiries.clear()
         _LOGGER.debug(f"Unregistered device '{device.unique_id}'")
 
     async def advertise(self, adapter_id: str | None, queue_id: str, qi: BleAdvQueueItem) -> None:
         """Advertise."""
         # Ignore the future emitted advs while they are being emitted by potentially other adapters
+        expiry = _now_ms() + qi.ign_duration
         for raw_adv in qi.data:
-            self._emit_last_advs[bytes(raw_adv)] = datetime.now() + timedelta(milliseconds=qi.ign_duration)
+            self._set_emit_last_adv(raw_adv, expiry)
         if adapter_id in self._hci_bt_manager.adapters:
             await self._hci_bt_manager.adapters[adapter_id].enqueue(queue_id, qi)
         elif adapter_id in self._esp_bt_manager.adapters:
@@ -237,79 +281,128 @@ class BleAdvCoordinator:
                 return [codec_id, raw_adv.hex().upper(), repr(enc_cmd), repr(conf), " / ".join([repr(x) for x in ent_attrs])]
         return ["Could not be decoded by any known codec"]
 
+    def _set_raw_last_adv(self, raw_adv: bytes, expiry: int) -> None:
+        self._raw_last_advs[raw_adv] = expiry
+        heappush(self._raw_expiries, (expiry, raw_adv))
+
+    def _set_emit_last_adv(self, raw_adv: bytes, expiry: int) -> None:
+        self._emit_last_advs[raw_adv] = expiry
+        heappush(self._emit_expiries, (expiry, raw_adv))
+
+    def _set_dec_last_adv(self, raw_adv: bytes, recv: BleAdvRecvItem) -> None:
+        self._dec_last_advs[raw_adv] = recv
+        heappush(self._dec_expiries, (recv.del_time, raw_adv))
+
+    def _purge_last_advs(self, now: int) -> None:
+        # a popped expiry is stale if the adv was since re-inserted with a later one
+        while self._raw_expiries and self._raw_expiries[0][0] <= now:
+            expiry, raw_adv = heappop(self._raw_expiries)
+            if self._raw_last_advs.get(raw_adv) == expiry:
+                del self._raw_last_advs[raw_adv]
+        while self._emit_expiries and self._emit_expiries[0][0] <= now:
+            expiry, raw_adv = heappop(self._emit_expiries)
+            if self._emit_last_advs.get(raw_adv) == expiry:
+                del self._emit_last_advs[raw_adv]
+        while self._dec_expiries and self._dec_expiries[0][0] <= now:
+            expiry, raw_adv = heappop(self._dec_expiries)
+            recv = self._dec_last_advs.get(raw_adv)
+            if recv is not None and recv.del_time == expiry:
+                del self._dec_last_advs[raw_adv]
+
     async def _publish_to_devices(self, adapter_id: str, recv: BleAdvRecvItem) -> None:
         # Publish to any device that matches, if not already done
-        for device in self._devices:
-            if device.unique_id not in recv.pub_devices and device.match(recv.match_id, adapter_id, recv.conf):
+        for device in self._device_index.get((recv.match_id, adapter_id, recv.conf.id, recv.conf.index), ()):
+            if device.unique_id not in recv.pub_devices:
                 await device.async_on_command(recv.ent_attrs)
                 recv.pub_devices.add(device.unique_id)
 
-    def _handle_listening(self, adapter_id: str, _: str, raw_adv: bytes) -> None:
-        if raw_adv not in self.listened_raw_advs:
+    def _handle_listening(self, adapter_id: str, raw_adv: bytes, adv: BleAdvAdvertisement) -> None:
+        if raw_adv not in self._listened_raw_set:
+            self._listened_raw_set.add(raw_adv)
             self.listened_raw_advs.append(raw_adv)
         for codec_id, acodec in self.codecs.items():
-            __, conf = acodec.decode_adv(BleAdvAdvertisement.FromRaw(raw_adv))
+            _, conf = acodec.decode_adv(adv)
             if conf is not None:
-                data = (adapter_id, codec_id, acodec.match_id, conf)
-                if data not in self.listened_decoded_confs:
-                    self.listened_decoded_confs.append(data)
-
-    async def handle_raw_adv(self, adapter_id: str, orig: str, raw_adv: bytes) -> None:
-        """Handle a raw advertising."""
-        try:
-            # check if the received orig is in the ignored macs, or if too short to be considered
-            if orig in self.ign_macs or len(raw_adv) < 8:
-                return
+                key = (adapter_id, codec_id, *astuple(conf))
+                if key not in self._listened_decoded_set:
+                    self._listened_decoded_set.add(key)
+                    self.listened_decoded_confs.append((adapter_id, codec_id, acodec.match_id, conf))
+
+    def _decode_adv(self, adv: BleAdvAdvertisement, now: int) -> list[BleAdvRecvItem]:
+        # Decode the adv with in use codecs only, and only the ones expecting this BLE type and length.
+        # Purely synchronous: the decoded advs are registered before any publish yields to the event loop,
+        # so that the same adv received again meanwhile is not decoded twice.
+        recvs = []
+        for codec_id in self._in_use_codecs.get((adv.ble_type, len(adv.raw)), ()):
+            acodec = self.codecs[codec_id]
+            enc_cmd, conf = acodec.decode_adv(adv)
+            if conf is not None and enc_cmd is not None:
+                ent_attrs = acodec.enc_to_ent(enc_cmd)
+                recv = BleAdvRecvItem(now + acodec.ign_duration, acodec.match_id, set(), conf, ent_attrs)
+                _LOGGER.debug(f"[{codec_id}] {conf} / {enc_cmd} / {ent_attrs}")
+                if acodec.multi_advs:
+                    for reenc_adv in acodec.encode_advs(enc_cmd, conf):
+                        self._set_dec_last_adv(reenc_adv.raw, recv)
+                else:
+                    self._set_dec_last_adv(adv.raw, recv)
+                recvs.append(recv)
+        return recvs
+
+    def _filter_raw(self, adapter_id: str, orig: str, raw_adv: bytes) -> tuple[BleAdvAdvertisement, int] | None:
+        # Synchronous part of the raw adv handling, returning None for all the ignored advs (the vast majority),
+        # or the parsed adv and the current time if it is to be published
+        # check if the received orig is in the ignored macs, or if too short to be considered
+        if orig in self.ign_macs or len(raw_adv) < 8:
+            return None
+
+        # Clean-up last raw / emitted / decoded advs based on expiry date
+        now = _now_ms()
+        self._purge_last_advs(now)
+
+        # Check if already present in last emitted advs: ignore
+        if raw_adv in self._emit_last_advs:
+            return None
+
+        # Check if already present in last raw advs: extend exclusion duration
+        if raw_adv in self._raw_last_advs:
+            self._set_raw_last_adv(raw_adv, now + self.ign_duration)
+            return None
+
+        # Parse the raw data once and find the relevant info ble_type and raw, duplicates being dropped before
+        adv = BleAdvAdvertisement.FromRaw(raw_adv)
 
-            # Parse the raw data and find the relevant info ble_type and raw
-            adv = BleAdvAdvertisement.FromRaw(raw_adv)
+        # Exclude by Company ID
+        if adv.raw[:2] in self._ign_cid_prefixes:
+            return None
 
-            # Exclude by Company ID
-            if int.from_bytes(adv.raw[:2], "little") in self.ign_cids:
-                return
+        if self.is_listening():
+            self._handle_listening(adapter_id, raw_adv, adv)
 
-            # Clean-up last raw / emitted / decoded advs based on expiry date
-            now = datetime.now()
-            self._raw_last_advs = {x: y for x, y in self._raw_last_advs.items() if (y > now)}
-            self._emit_last_advs = {x: y for x, y in self._emit_last_advs.items() if (y > now)}
-            self._dec_last_advs = {x: y for x, y in self._dec_last_advs.items() if (y.del_time > now)}
+        return adv, now
 
-            # Check if already present in last emitted advs: ignore
-            if raw_adv in self._emit_last_advs:
-                return
-
-            # Check if already present in last raw advs: extend exclusion duration
-            if raw_adv in self._raw_last_advs:
-                self._raw_last_advs[raw_adv] = now + timedelta(milliseconds=self.ign_duration)
+    async def handle_raw_adv(self, adapter_id: str, orig: str, raw_adv: bytes) -> None:
+        """Handle a raw advertising."""
+        try:
+            work = self._filter_raw(adapter_id, orig, raw_adv)
+            if work is None:
                 return
-
-            if self.is_listening():
-                self._handle_listening(adapter_id, orig, raw_adv)
+            adv, now = work
 
             # Check if already present in last decoded advs: re check another matching device with different adapter
-            if adv.raw in self._dec_last_advs:
-                await self._publish_to_devices(adapter_id, self._dec_last_advs[adv.raw])
+            last_recv = self._dec_last_advs.get(adv.raw)
+            if last_recv is not None:
+                await self._publish_to_devices(adapter_id, last_recv)
                 return
 
-            # Try to decode Adv with in used codecs only
-            recv = None
-            for codec_id in self._in_use_codecs:
-                acodec = self.codecs[codec_id]
-                enc_cmd, conf = acodec.decode_adv(adv)
-                if conf is not None and enc_cmd is not None:
-                    ent_attrs = acodec.enc_to_ent(enc_cmd)
-                    recv = BleAdvRecvItem(now + timedelta(milliseconds=acodec.ign_duration), acodec.match_id, set(), conf, ent_attrs)
-                    _LOGGER.debug(f"[{codec_id}] {conf} / {enc_cmd} / {ent_attrs}")
-                    await self._publish_to_devices(adapter_id, recv)
-                    if acodec.multi_advs:
-                        for reenc_adv in acodec.encode_advs(enc_cmd, conf):
-                            self._dec_last_advs[reenc_adv.raw] = recv
-                    else:
-                        self._dec_last_advs[adv.raw] = recv
+            # Decode first, then publish
+            recvs = self._decode_adv(adv, now)
 
             # Not decoded by in_used codecs: consider raw and ignored during the next standard ign_duration
-            if not recv:
-                self._raw_last_advs[raw_adv] = now + timedelta(milliseconds=self.ign_duration)
+            if not recvs:
+                self._set_raw_last_adv(raw_adv, now + self.ign_duration)
+
+            for recv in recvs:
+                await self._publish_to_devices(adapter_id, recv)
 
         except Exception:
             _LOGGER.exception(f"[{adapter_id}] Exception handling raw adv message")
@@ -323,9 +416,9 @@ class BleAdvCoordinator:
             "ign_duration": self.ign_duration,
             "ign_cids": list(self.ign_cids),
             "ign_macs": list(self.ign_macs),
-            "last_emitted": {x.hex().upper(): y for x, y in self._emit_last_advs.items()},
-            "last_unk_raw": {x.hex().upper(): y for x, y in self._raw_last_advs.items()},
-            "last_dec_raw": {x.hex().upper(): y for x, y in self._dec_last_advs.items()},
+            "last_emitted": {x.hex().upper(): _as_datetime(y) for x, y in self._emit_last_advs.items()},
+            "last_unk_raw": {x.hex().upper(): _as_datetime(y) for x, y in self._raw_last_advs.items()},
+            "last_dec_raw": {x.hex().upper(): {**vars(y), "del_time": _as_datetime(y.del_time)} for x, y in self._dec_last_advs.items()},
         }
 
     async def full_diagnostic_dump(self) -> dict[str, Any]:
@@ -44,6 +44,7 @@ class BleAdvStateAttribute:
 
     def __init__(self, name: str, default: bool | int | str | tuple | None, chg_attrs: list[str], resets: list[str] | None = None) -> None:
         self.name: str = name
+        self.attr_name: str = f"_attr_{name}"
         self.default: bool | int | str | tuple | None = default
         self.chg_attrs: list[str] = chg_attrs
         self.resets: list[str] = resets if resets is not None else []
@@ -90,18 +91,21 @@ class BleAdvEntity(RestoreEntity):
         """Get a state attribute value."""
         return getattr(self, f"_attr_{attr_name}")
 
+    def _set_attr(self, attr_name: str, attr_value: Any) -> bool:  # noqa: ANN401
+        prev_value = getattr(self, attr_name)
+        setattr(self, attr_name, attr_value)
+        return attr_value != prev_value
+
     def set_state_attribute(self, attr_name: str, attr_value: Any) -> bool:  # noqa: ANN401
         """Set a state attribute."""
-        prev_value = self.get_state_attribute(attr_name)
-        setattr(self, f"_attr_{attr_name}", attr_value)
-        return attr_value != prev_value
+        return self._set_attr(f"_attr_{attr_name}", attr_value)
 
     async def _handle_state_change(self, chg_map: dict[str, Any]) -> None:
         chg_attrs = []
         forced_chg_attrs = []
         for state_attr in self._state_attributes:
             if state_attr.name in chg_map:
-                if self.set_state_attribute(state_attr.name, chg_map.get(state_attr.name)):
+                if self._set_attr(state_attr.attr_name, chg_map[state_attr.name]):
                     chg_attrs += state_attr.chg_attrs
                     for attr_reset in state_attr.resets:
                         self.set_state_attribute(attr_reset, None)
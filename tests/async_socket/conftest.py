@@ -4,6 +4,7 @@
 
 import asyncio
 import pickle
+import socket
 from collections.abc import Generator
 from typing import Self
 from unittest import mock
@@ -17,12 +18,16 @@ class _SocketMock(mock.MagicMock):
     def init(self) -> None:
         self._recv_queue: asyncio.Queue = asyncio.Queue()
 
-    async def sock_recv(self, _: Self, __: int) -> bytes:
+    async def sock_recv_into(self, _: Self, buf: memoryview) -> int:
         data = await self._recv_queue.get()
         self._recv_queue.task_done()
         if data == self.BP_ERROR:
             raise BrokenPipeError("broken pipe")
-        return data
+        buf[: len(data)] = data
+        return len(data)
+
+    async def sock_sendall(self, _: Self, data: bytes) -> None:
+        self.sendall(data)
 
     def simulate_recv(self, data: bytes) -> None:
         self._recv_queue.put_nowait(data)
@@ -40,7 +45,11 @@ def socket_mock_inst() -> Generator[_SocketMock]:
     with mock.patch("socket.socket", new_callable=_SocketMock) as mock_socket:
         mock_inst = mock_socket.return_value
         mock_inst.init()
-        with mock.patch.object(asyncio.get_event_loop(), "sock_recv", side_effect=mock_inst.sock_recv):
+        loop = asyncio.get_event_loop()
+        with (
+            mock.patch.object(loop, "sock_recv_into", side_effect=mock_inst.sock_recv_into),
+            mock.patch.object(loop, "sock_sendall", side_effect=mock_inst.sock_sendall),
+        ):
             yield mock_inst
 
 
@@ -57,35 +66,33 @@ def btsocket_mock_inst() -> Generator[_SocketMock]:
     ):
         mock_inst = mock_socket.return_value
         mock_inst.init()
-        with mock.patch.object(asyncio.get_event_loop(), "sock_recv", side_effect=mock_inst.sock_recv):
+        loop = asyncio.get_event_loop()
+        with (
+            mock.patch.object(loop, "sock_recv_into", side_effect=mock_inst.sock_recv_into),
+            mock.patch.object(loop, "sock_sendall", side_effect=mock_inst.sock_sendall),
+        ):
             yield mock_inst
 
 
 class _ConMock:
-    """Mock a socket pair created by 'open_unix_connection'.
+    """Mock a unix socket connected to the tunnel.
 
     Act as the tunnel_socket server
     """
 
     def __init__(self) -> None:
-        self.reader = mock.AsyncMock(spec=asyncio.StreamReader)
-        self.reader.read.side_effect = self._read
-        self.writer = mock.AsyncMock(spec=asyncio.StreamWriter)
-        self.writer.write.side_effect = self._write
-        self.writer.close.side_effect = self.close
+        self.sock = mock.MagicMock(spec=socket.socket)
+        self.sock.close.side_effect = self.close
         self._recv_queue: asyncio.Queue = asyncio.Queue()
+        self._pending: bytes = b""
         self.patched_method = {}
 
-    def open_unix_connection(self, path: str) -> tuple[mock.AsyncMock, mock.AsyncMock]:  # noqa: ARG002
-        return self.reader, self.writer
-
     def close(self) -> None:
         self._recv_queue.put_nowait(b"")
 
-    def _write(self, data: bytes) -> None:
-        if len(data) == 2:
-            return
-        (version, args) = pickle.loads(data)  # noqa: S301
+    async def sock_sendall(self, _: socket.socket, data: bytes) -> None:
+        assert int.from_bytes(data[:2]) == len(data) - 2, "Invalid length"
+        (version, args) = pickle.loads(data[2:])  # noqa: S301
         assert version == 10, "Invalid version"
         method = args[0]
         if method in self.patched_method:
@@ -98,20 +105,29 @@ class _ConMock:
         else:
             self.simulate_recv(0, None)
 
-    async def _read(self, _: int) -> bytes:
-        data = await self._recv_queue.get()
-        self._recv_queue.task_done()
-        return data
+    async def sock_recv_into(self, _: socket.socket, buf: memoryview) -> int:
+        if not self._pending:
+            self._pending = await self._recv_queue.get()
+            self._recv_queue.task_done()
+        nbytes = min(len(buf), len(self._pending))
+        buf[:nbytes] = self._pending[:nbytes]
+        self._pending = self._pending[nbytes:]
+        return nbytes
 
     def simulate_recv(self, action_code: int, client_data: int | str | None) -> None:
         data = pickle.dumps((action_code, client_data))
-        self._recv_queue.put_nowait(len(data).to_bytes(2))
-        self._recv_queue.put_nowait(data)
+        self._recv_queue.put_nowait(len(data).to_bytes(2) + data)
 
 
 @pytest.fixture
 def con_mock() -> Generator[_ConMock]:
     """Fixture unix connection."""
     con_mock = _ConMock()
-    with mock.patch("asyncio.open_unix_connection", side_effect=con_mock.open_unix_connection):
+    loop = asyncio.get_event_loop()
+    with (
+        mock.patch("socket.socket", return_value=con_mock.sock),
+        mock.patch.object(loop, "sock_connect"),
+        mock.patch.object(loop, "sock_sendall", side_effect=con_mock.sock_sendall),
+        mock.patch.object(loop, "sock_recv_into", side_effect=con_mock.sock_recv_into),
+    ):
         yield con_mock
@@ -3,10 +3,11 @@
 # ruff: noqa: S101
 import asyncio
 import os
+import socket
 from unittest import mock
 
 import pytest
-from ble_adv_split.async_socket import TUNNEL_SOCKET_FILE_VAR, AsyncSocket, AsyncTunnelSocket, create_async_socket
+from ble_adv_split.async_socket import TUNNEL_SOCKET_BUFFER_SIZE, TUNNEL_SOCKET_FILE_VAR, AsyncSocket, AsyncTunnelSocket, create_async_socket
 
 from .conftest import _ConMock, _SocketMock
 
@@ -27,6 +28,12 @@ async def test_socket(socket_mock_inst: _SocketMock) -> None:
     socket_mock_inst.setsockopt.assert_not_called()
     await sock.async_setsockopt(1, 2, 3)
     socket_mock_inst.setsockopt.assert_called_once_with(1, 2, 3)
+    socket_mock_inst.setsockopt.side_effect = ValueError("Invalid option")
+    with pytest.raises(ValueError, match="Invalid option"):
+        await sock.async_setsockopt(1, 2, 3)
+    socket_mock_inst.sendall.assert_not_called()
+    await sock.async_sendall(b"send data")
+    socket_mock_inst.sendall.assert_called_once_with(b"send data")
     await sock.async_start_recv()
     mock_recv_callback.assert_not_called()
     socket_mock_inst.simulate_recv(b"recv data")
@@ -35,6 +42,8 @@ async def test_socket(socket_mock_inst: _SocketMock) -> None:
     sock.close()
     await asyncio.sleep(0.1)
     mock_error_callback.assert_not_called()
+    with pytest.raises(OSError, match="Socket not opened"):
+        await sock.async_sendall(b"send data")
 
 
 async def test_socket_on_error(socket_mock_inst: _SocketMock) -> None:
@@ -113,6 +122,7 @@ async def test_tunnel_socket(con_mock: _ConMock) -> None:
     await sock._async_recv()  # noqa: SLF001
     await sock._async_call("nm")  # noqa: SLF001
     await sock.async_init("test", mock_recv_callback, mock_error_callback, False, "", "", "")
+    con_mock.sock.setsockopt.assert_any_call(socket.SOL_SOCKET, socket.SO_SNDBUF, TUNNEL_SOCKET_BUFFER_SIZE)
     con_mock.simulate_recv(100, "invalid action")
     con_mock.patched_method["bind"] = (1, OSError("Connection Error"))
     with pytest.raises(OSError):
@@ -125,6 +135,9 @@ async def test_tunnel_socket(con_mock: _ConMock) -> None:
     con_mock.simulate_recv(10, "recv data")
     await asyncio.sleep(0.1)
     mock_recv_callback.assert_called_with("recv data")
+    con_mock.simulate_recv(10, "large recv data" * 1000)
+    await asyncio.sleep(0.1)
+    mock_recv_callback.assert_called_with("large recv data" * 1000)
     sock.close()
     await asyncio.sleep(0.1)
     mock_error_callback.assert_not_called()
@@ -151,6 +164,20 @@ async def test_tunnel_socket_on_error(con_mock: _ConMock) -> None:
     mock_error_callback.assert_not_called()  # close by standard close: on_error not called
 
 
+async def test_tunnel_socket_forbidden_global(con_mock: _ConMock) -> None:
+    """Test AsyncTunnelSocket refuses frames with globals other than exceptions."""
+    sock = AsyncTunnelSocket()
+    mock_recv_callback = mock.AsyncMock()
+    mock_error_callback = mock.AsyncMock()
+    await sock.async_init("test", mock_recv_callback, mock_error_callback, False, "", "", "")
+    await sock.async_start_recv()
+    con_mock.simulate_recv(10, os.getcwd)
+    await asyncio.sleep(0.1)
+    mock_recv_callback.assert_not_called()
+    mock_error_callback.assert_called()
+    sock.close()
+
+
 def test_create_async_socket() -> None:
     """Test AsyncSocket factory."""
     with mock.patch.dict(os.environ, {}, clear=True):
@@ -1,10 +1,12 @@
 # ruff: noqa: S101
 """Codec Tests."""
 
+from collections.abc import Mapping
+
 from ble_adv_split.codecs import get_codecs
 from ble_adv_split.codecs.models import BleAdvAdvertisement, BleAdvCodec
 
-CODECS: dict[str, BleAdvCodec] = get_codecs()
+CODECS: Mapping[str, BleAdvCodec] = get_codecs()
 # Disable tx_count bump by codecs
 for codec in CODECS.values():
     codec._tx_step = 0  # noqa: SLF001
@@ -1,7 +1,8 @@
 """Test global init and codec consistency."""
 
 # ruff: noqa: S101
-from ble_adv_split.codecs import PHONE_APPS, get_codec_list
+import pytest
+from ble_adv_split.codecs import PHONE_APPS, get_codec_list, get_codecs
 
 
 def test_codec_unique_id() -> None:
@@ -22,3 +23,12 @@ def test_exist_phone_app() -> None:
     id_list = [x.codec_id for x in get_codec_list()]
     for app_name, phone_app_ids in PHONE_APPS.items():
         assert all(x in id_list for x in phone_app_ids), f"Not all id exist for {app_name}"
+
+
+def test_codecs_read_only() -> None:
+    """Check that the shared codec list and map cannot be modified."""
+    assert [x.codec_id for x in get_codec_list()] == list(get_codecs().keys())
+    with pytest.raises(TypeError):
+        get_codecs()["any"] = get_codec_list()[0]
+    with pytest.raises(AttributeError):
+        get_codec_list().append(get_codec_list()[0])
@@ -257,6 +257,7 @@ def test_codec() -> None:
     assert codec.codec_id == "test_codec"
     assert codec._ble_type == 0x16  # noqa: SLF001
     assert codec._header == bytearray([0x55, 0x56])  # noqa: SLF001
+    assert codec.adv_key == (0x16, 6)
     assert codec.get_supported_features(LIGHT_TYPE) == [{}, {ATTR_ON: {False, True}, ATTR_SUB_TYPE: {LIGHT_TYPE_ONOFF}}]
     assert codec.get_supported_features(FAN_TYPE) == [{ATTR_PRESET: {ATTR_PRESET_BREEZE, ATTR_PRESET_SLEEP}}]
     codec.add_translators(
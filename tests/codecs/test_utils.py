@@ -0,0 +1,13 @@
+"""Test codecs utils."""
+
+# ruff: noqa: S101
+import pytest
+from ble_adv_split.codecs.utils import add_bytes
+
+
+@pytest.mark.parametrize("buf_len", [1, 14, 32, 40, 64])
+def test_add_bytes(buf_len: int) -> None:
+    """Check add_bytes against a byte per byte addition modulo 256, for any buffer length."""
+    buffer = bytes((37 * i + 200) & 0xFF for i in range(buf_len))
+    key = bytes((91 * i + 150) & 0xFF for i in range(buf_len))
+    assert add_bytes(buffer, int.from_bytes(key)) == bytes((a + b) & 0xFF for a, b in zip(buffer, key, strict=True))
@@ -18,11 +18,13 @@ class _Codec(mock.MagicMock):
     encode_advs = mock.MagicMock(return_value=[BleAdvAdvertisement(0xFF, b"bouhbouh")])
     enc_to_ent = mock.MagicMock(return_value=[])
     ign_duration = 2
+    adv_key = (0xFF, 12)
 
 
 class _Device(BleAdvBaseDevice):
-    def __init__(self, coord: BleAdvCoordinator, name: str, codec_id: str, adapter_ids: list[str]) -> None:
-        super().__init__(coord, name, codec_id, adapter_ids, 1, 10, 1000, BleAdvConfig(1, 1))
+    def __init__(self, coord: BleAdvCoordinator, name: str, codec_id: str, adapter_ids: list[str], index: int = 1) -> None:
+        super().__init__(coord, name, codec_id, adapter_ids, 1, 10, 1000, BleAdvConfig(1, index))
+        self.async_on_command = mock.AsyncMock()
 
 
 def _get_codecs() -> dict[str, BleAdvCodec]:
@@ -72,6 +74,109 @@ async def test_coordinator(hass: HomeAssistant) -> None:
     await coord.async_final()
 
 
+async def test_device_index(hass: HomeAssistant) -> None:
+    """Test the devices index rebuilt on device addition / removal."""
+    coord = BleAdvCoordinator(hass, _get_codecs(), ["hci"], 20000, [], [])
+    dev1 = _Device(coord, "dev1", "cod1", ["a1"])
+    dev2 = _Device(coord, "dev2", "cod2/a", ["a1", "a2"])
+    coord.add_device(dev1)
+    assert coord._device_index == {("cod1", "a1", 1, 1): [dev1]}  # noqa: SLF001
+    coord.add_device(dev2)
+    assert coord._device_index == {  # noqa: SLF001
+        ("cod1", "a1", 1, 1): [dev1],
+        ("cod2", "a1", 1, 1): [dev2],
+        ("cod2", "a2", 1, 1): [dev2],
+    }
+    coord.remove_device(dev1)
+    assert coord._device_index == {("cod2", "a1", 1, 1): [dev2], ("cod2", "a2", 1, 1): [dev2]}  # noqa: SLF001
+    coord.remove_device(dev2)
+    assert coord._device_index == {}  # noqa: SLF001
+
+
+async def test_raw_expiry(hass: HomeAssistant) -> None:
+    """Test the re-insertion, expiry and purge of the last raw advs."""
+    raw_adv = bytes([0x09, 0xFF, 0x01, 0x02, 0x03, 0x04, 0x05, 0x06, 0x07, 0x08])
+    other_adv = bytes([0x09, 0xFF, 0x11, 0x12, 0x13, 0x14, 0x15, 0x16, 0x17, 0x18])
+    with mock.patch("ble_adv_split.coordinator._now_ms", return_value=1000) as now_ms:
+        coord = BleAdvCoordinator(hass, _get_codecs(), ["hci"], 100, [], [])
+        await coord.handle_raw_adv("aaa", "mac", raw_adv)
+        await coord.handle_raw_adv("aaa", "mac", raw_adv)  # same expiry: duplicated heap entry
+        assert coord._raw_last_advs == {raw_adv: 1100}  # noqa: SLF001
+        now_ms.return_value = 1050
+        await coord.handle_raw_adv("aaa", "mac", raw_adv)  # re-inserted with a later expiry
+        assert coord._raw_last_advs == {raw_adv: 1150}  # noqa: SLF001
+        assert len(coord._raw_expiries) == 3  # noqa: SLF001
+        now_ms.return_value = 1100
+        await coord.handle_raw_adv("aaa", "mac", other_adv)  # stale entries purged, raw adv kept
+        assert coord._raw_last_advs == {raw_adv: 1150, other_adv: 1200}  # noqa: SLF001
+        assert coord._raw_expiries == [(1150, raw_adv), (1200, other_adv)]  # noqa: SLF001
+        now_ms.return_value = 1200
+        coord._purge_last_advs(1200)  # noqa: SLF001
+        assert coord._raw_last_advs == {}  # noqa: SLF001
+        assert coord._raw_expiries == []  # noqa: SLF001
+
+
+async def test_emit_expiry(hass: HomeAssistant) -> None:
+    """Test the emitted advs ignored until their expiry."""
+    adv = BleAdvAdvertisement(0xFF, b"dtwithminlen")
+    with mock.patch("ble_adv_split.coordinator._now_ms", return_value=1000) as now_ms:
+        coord = BleAdvCoordinator(hass, _get_codecs(), ["hci"], 100, [], [])
+        dev = _Device(coord, "dev1", "cod1", ["aaa"], 0)
+        coord.add_device(dev)
+        await coord.advertise("aaa", "q1", BleAdvQueueItem(0x10, 1, 100, 20, [adv.to_raw()], 50))
+        now_ms.return_value = 1049
+        await coord.handle_raw_adv("aaa", "mac", adv.to_raw())
+        dev.async_on_command.assert_not_called()
+        now_ms.return_value = 1050
+        await coord.handle_raw_adv("aaa", "mac", adv.to_raw())
+        dev.async_on_command.assert_awaited_once()
+        assert coord._emit_last_advs == {}  # noqa: SLF001
+
+
+async def test_decoded_expiry(hass: HomeAssistant) -> None:
+    """Test the decoded advs publish, re-insertion, expiry and purge."""
+    codecs = _get_codecs()
+    codecs["cod2/a"].ign_duration = 5
+    adv = BleAdvAdvertisement(0xFF, b"dtwithminlen")
+    with mock.patch("ble_adv_split.coordinator._now_ms", return_value=1000) as now_ms:
+        coord = BleAdvCoordinator(hass, codecs, ["hci"], 100, [], [])
+        dev = _Device(coord, "dev1", "cod1", ["aaa"], 0)
+        dev.add_listener("cod2/a", BleAdvConfig(1, 0))
+        coord.add_device(dev)
+        # both codecs decode the adv: the one of cod2 re-inserted with a later expiry
+        await coord.handle_raw_adv("aaa", "mac", adv.to_raw())
+        assert dev.async_on_command.await_count == 2
+        assert coord._dec_last_advs[adv.raw].del_time == 1005  # noqa: SLF001
+        assert len(coord._dec_expiries) == 2  # noqa: SLF001
+        # already published to the device, not matching from the other adapter
+        await coord.handle_raw_adv("aaa", "mac", adv.to_raw())
+        await coord.handle_raw_adv("bbb", "mac", adv.to_raw())
+        assert dev.async_on_command.await_count == 2
+        # stale expiry of cod1 purged, decoded adv of cod2 kept
+        now_ms.return_value = 1002
+        coord._purge_last_advs(1002)  # noqa: SLF001
+        assert coord._dec_last_advs[adv.raw].del_time == 1005  # noqa: SLF001
+        assert coord._dec_expiries == [(1005, adv.raw)]  # noqa: SLF001
+        # expired: decoded and published again
+        now_ms.return_value = 1005
+        await coord.handle_raw_adv("aaa", "mac", adv.to_raw())
+        assert dev.async_on_command.await_count == 4
+        assert coord._dec_last_advs[adv.raw].del_time == 1010  # noqa: SLF001
+
+
+async def test_adv_key(hass: HomeAssistant) -> None:
+    """Test the advs not matching the BLE type and length of the in use codecs are not decoded."""
+    codecs = _get_codecs()
+    coord = BleAdvCoordinator(hass, codecs, ["hci"], 100, [], [])
+    dev = _Device(coord, "dev1", "cod1", ["aaa"], 0)
+    coord.add_device(dev)
+    codecs["cod1"].decode_adv.reset_mock()
+    await coord.handle_raw_adv("aaa", "mac", BleAdvAdvertisement(0xFF, b"notminlen").to_raw())
+    await coord.handle_raw_adv("aaa", "mac", BleAdvAdvertisement(0x16, b"dtwithminlen").to_raw())
+    codecs["cod1"].decode_adv.assert_not_called()
+    dev.async_on_command.assert_not_called()
+
+
 async def test_listening(hass: HomeAssistant) -> None:
     """Test listening mode."""
     coord = BleAdvCoordinator(hass, _get_codecs(), ["hci"], 20000, [], [])
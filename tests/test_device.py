@@ -103,11 +103,12 @@ async def test_device(hass: HomeAssistant) -> None:
     assert not ent0.is_on
     assert not ent1.is_on
     all_on_cmd = BleAdvEntAttr([ATTR_ON], {ATTR_ON: True}, DEVICE_TYPE, 0)
-    assert not device.match("not_my_codec", "my_adapter", conf)
+    assert ("not_my_codec", "my_adapter", conf.id, conf.index) not in device.match_keys()
     assert not ent0.is_on
     assert not ent1.is_on
-    assert not device.match("my_codec", "not_my_adapter", conf)
-    assert device.match("my_codec", "my_adapter", conf)
+    assert ("my_codec", "not_my_adapter", conf.id, conf.index) not in device.match_keys()
+    assert device.match_keys() == {("my_codec", "my_adapter", conf.id, conf.index)}
+    assert coord._device_index == {("my_codec", "my_adapter", conf.id, conf.index): [device]}  # noqa: SLF001
     await device.async_on_command([all_on_cmd])
     assert ent0.is_on
     assert ent1.is_on